@@ -0,0 +1,3 @@
+from bench.simulation import main
+
+main()
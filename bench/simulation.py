@@ -0,0 +1,186 @@
+"""
+Бенчмарк симуляции частиц без окна и контекста OpenGL.
+
+Собирает ту же конфигурацию, что и main.py (точечный эмиттер, пол, цилиндр-антиаттрактор),
+прогоняет ParticleSystem.update с фиксированным шагом и выводит время фаз и паузы сборщика
+мусора в формате JSON:
+
+    python -m bench --particles 1000 10000 100000 --frames 300 --output bench_output.json
+
+Масштабирование многопоточных ядер numba по количеству потоков:
+
+    python -m bench --particles 500000 --backend numba --threads 1 2 4 8 --distance-field 64
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from particles.anti_attractor import AntiAttractorHandler
+from particles.emitters.point_emitter import PointEmitter
+from particles.particle_system import ParticleSystem
+from particles.profiling import GCMonitor, PhaseTimer
+from shapes.cylinder import Cylinder
+from shapes.plane import Plane
+
+# Параметры сцены из main.py
+RANGE_OF_EFFECT = 1.0
+LIFETIME = 5.0
+PHASES = ('emit', 'integrate', 'anti_attractor', 'trail')
+
+
+def build_particle_system(particle_count, seed=None, workers=0, backend='numpy', threads=None,
+                          distance_field_resolution=None, lazy_trajectories=False, max_particle_substeps=8):
+    """Создаёт систему частиц сцены main.py, рассчитанную на particle_count живых частиц."""
+    floor = Plane(position=[0.0, 0.0, 0.0], scale=20.0, rotation=[0.0, 0.0, 0.0])
+    cylinder = Cylinder(position=[0.0, 2.0, -2.0], base_radius=2.0, top_radius=2.0, height=4.0,
+                        rotation=[90, 0, 0])
+    anti_attractor_handler = AntiAttractorHandler([floor, cylinder], RANGE_OF_EFFECT)
+    if distance_field_resolution is not None:
+        anti_attractor_handler.enable_distance_field(distance_field_resolution)
+    particle_system = ParticleSystem(anti_attractor_handler, workers=workers, backend=backend, threads=threads,
+                                     lazy_trajectories=lazy_trajectories,
+                                     max_particle_substeps=max_particle_substeps)
+
+    # Частота эмиссии подобрана так, чтобы в установившемся режиме жило particle_count частиц
+    point_emitter = PointEmitter(
+        position=[2.5, 4.0, 2.5],
+        emission_rate=particle_count / LIFETIME,
+        max_particles=particle_count,
+        speed_range=(6.0, 8.0),
+        size_range=(4.0, 7.0),
+        color=[255, 127, 0, 255],
+        lifetime=LIFETIME,
+        color_fading=True,
+        transparency_radius=9.0,
+        has_trail=True,
+        seed=seed
+    )
+    particle_system.add_emitter(point_emitter)
+    return particle_system
+
+
+def run(particle_count, frames, delta_time, warmup_frames, seed, workers=0, backend='numpy', threads=None,
+        distance_field_resolution=None, lazy_trajectories=False, max_particle_substeps=8):
+    """Прогоняет симуляцию и возвращает замеры для одного количества частиц."""
+    random.seed(seed)
+    np.random.seed(seed)
+    particle_system = build_particle_system(particle_count, seed, workers, backend, threads, distance_field_resolution,
+                                            lazy_trajectories, max_particle_substeps)
+
+    # Прогрев до установившегося количества частиц, в замеры не входит
+    for _ in range(warmup_frames):
+        particle_system.update(delta_time)
+
+    timer = PhaseTimer()
+    particle_system.timer = timer
+    frame_times = []
+    with GCMonitor() as gc_monitor:
+        for _ in range(frames):
+            start = time.perf_counter()
+            particle_system.update(delta_time)
+            frame_times.append(time.perf_counter() - start)
+
+    effective_threads = particle_system.kernels.get_threads()
+    alive = sum(emitter.buffer.count for emitter in particle_system.emitters)
+    free = sum(int(emitter.buffer.free_mask().sum()) for emitter in particle_system.emitters)
+    particle_system.close()
+    return {
+        'particles': particle_count,
+        'backend': particle_system.kernels.NAME,
+        'threads': threads,
+        'effective_threads': effective_threads,
+        'alive_particles': alive,
+        'free_particles': free,
+        'frames': frames,
+        'frame_ms': {
+            'mean': statistics.fmean(frame_times) * 1000.0,
+            'median': statistics.median(frame_times) * 1000.0,
+            'p95': float(np.percentile(frame_times, 95)) * 1000.0,
+            'max': max(frame_times) * 1000.0,
+        },
+        'phases_ms': {
+            phase: {
+                'total': timer.totals[phase] * 1000.0,
+                'per_frame': timer.totals[phase] * 1000.0 / frames,
+            }
+            for phase in PHASES
+        },
+        # Нагрузка на сборщик мусора за замеряемые кадры
+        'gc': {
+            'collections': dict(zip(('gen0', 'gen1', 'gen2'), gc_monitor.collections)),
+            'collected_objects': gc_monitor.collected,
+            'pause_total_ms': gc_monitor.pause_total * 1000.0,
+            'pause_max_ms': gc_monitor.pause_max * 1000.0,
+        },
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Бенчмарк симуляции частиц без OpenGL.')
+    parser.add_argument('--particles', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='количества частиц для прогонов')
+    parser.add_argument('--frames', type=int, default=300, help='количество замеряемых кадров')
+    parser.add_argument('--dt', type=float, default=1.0 / 60.0, help='фиксированный шаг симуляции, с')
+    parser.add_argument('--warmup-frames', type=int, default=None,
+                        help='кадры прогрева (по умолчанию - время жизни частицы)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=0,
+                        help='процессы для параллельного обновления эмиттеров (0 - в основном процессе)')
+    parser.add_argument('--backend', choices=('numpy', 'numba'), default='numpy', help='ядра симуляции')
+    parser.add_argument('--threads', type=int, nargs='+', default=[None],
+                        help='количества потоков ядер numba для замера масштабирования')
+    parser.add_argument('--distance-field', type=int, default=None, metavar='RESOLUTION',
+                        help='запечь поле расстояний анти-аттракторов с таким разрешением')
+    parser.add_argument('--lazy-trajectories', action='store_true',
+                        help='не интегрировать пошагово частицы вне зон действия анти-аттракторов')
+    parser.add_argument('--max-particle-substeps', type=int, default=8,
+                        help='наибольшее количество подшагов для частиц у коллайдеров (1 - без подшагов)')
+    parser.add_argument('--output', help='файл для результатов (по умолчанию stdout)')
+    args = parser.parse_args(argv)
+
+    warmup_frames = args.warmup_frames if args.warmup_frames is not None else int(LIFETIME / args.dt)
+    report = {
+        'config': {
+            'frames': args.frames,
+            'dt': args.dt,
+            'warmup_frames': warmup_frames,
+            'seed': args.seed,
+            'workers': args.workers,
+            'backend': args.backend,
+            'distance_field': args.distance_field,
+            'lazy_trajectories': args.lazy_trajectories,
+            'max_particle_substeps': args.max_particle_substeps,
+        },
+        'environment': {
+            'commit': get_commit(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+        },
+        'results': [run(count, args.frames, args.dt, warmup_frames, args.seed, args.workers, args.backend, threads,
+                        args.distance_field, args.lazy_trajectories, args.max_particle_substeps)
+                    for count in args.particles for threads in args.threads],
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
@@ -0,0 +1,17 @@
+import hashlib
+import os
+
+# Каталог дискового кэша (запечённые поля расстояний, меши и т.п.)
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+
+
+def hash_key(*parts):
+    """Хеш от текстового представления параметров, используемый как имя файла кэша."""
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def get_cache_path(namespace, key, extension):
+    """Путь к файлу кэша в подкаталоге namespace; каталог создаётся при необходимости."""
+    directory = os.path.join(CACHE_DIR, namespace)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{key}.{extension}')
@@ -0,0 +1,20 @@
+import time
+
+
+class SystemClock:
+    """Часы реального времени для интерактивного приложения."""
+    def now(self):
+        """Текущее время в секундах."""
+        return time.perf_counter()
+
+
+class ManualClock:
+    """Часы, которые двигаются только вручную: для тестов, пакетных расчётов и серверов без дисплея."""
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def advance(self, delta_time):
+        self.time += delta_time
@@ -1,9 +1,9 @@
 #version 330 core
-out vec4 FragColor;
+in vec4 ParticleColor;
 
-uniform vec4 particleColor;
+out vec4 FragColor;
 
 void main()
 {
-    FragColor = particleColor;
+    FragColor = ParticleColor;
 }
@@ -1,5 +1,9 @@
 #version 330 core
 layout (location = 0) in vec3 aPos;
+layout (location = 1) in vec4 aColor;
+layout (location = 2) in float aSize;
+
+out vec4 ParticleColor;
 
 uniform mat4 projection;
 uniform mat4 view;
@@ -7,6 +11,7 @@ uniform mat4 model;
 
 void main()
 {
+    ParticleColor = aColor;
     gl_Position = projection * view * model * vec4(aPos, 1.0);
-    gl_PointSize = 10.0;
+    gl_PointSize = aSize;
 }
@@ -1,9 +1,16 @@
+import copy
+
 import glm
 import OpenGL.GL as gl
 
 
 class Shader:
-    def __init__(self, vertex_source_path: str, fragment_source_path: str):
+    def __init__(self, vertex_source_path: str, fragment_source_path: str, cache_values=True):
+        """
+        :param vertex_source_path: Путь к исходнику вершинного шейдера.
+        :param fragment_source_path: Путь к исходнику фрагментного шейдера.
+        :param cache_values: Не вызывать glUniform*, если значение uniform-переменной не изменилось.
+        """
         # Чтение исходников шейдеров
         with open(vertex_source_path, 'r') as file:
             vertex_source = file.read()
@@ -33,52 +40,109 @@ class Shader:
         gl.glDeleteShader(vertex_shader)
         gl.glDeleteShader(fragment_shader)
 
+        # Расположения активных uniform-переменных программы и последние установленные значения
+        self._uniform_locations = self._get_active_uniforms(self._program)
+        self.cache_values = cache_values
+        self._uniform_values = {}
+
     def use(self):
         gl.glUseProgram(self._program)
 
+    @staticmethod
+    def _get_active_uniforms(program):
+        """Перечисляет активные uniform-переменные программы после связывания: имя -> расположение."""
+        locations = {}
+        for index in range(gl.glGetProgramiv(program, gl.GL_ACTIVE_UNIFORMS)):
+            name, _, _ = gl.glGetActiveUniform(program, index)
+            name = name.decode() if isinstance(name, bytes) else name
+            location = gl.glGetUniformLocation(program, name)
+            locations[name] = location
+            # Массивы перечисляются как 'name[0]', но обращаются к ним и просто по имени
+            if name.endswith('[0]'):
+                locations[name[:-3]] = location
+        return locations
+
+    def _get_location(self, name: str):
+        location = self._uniform_locations.get(name)
+        if location is None:
+            # Неактивные и неперечисленные имена запрашиваем один раз (для неактивных будет -1)
+            location = gl.glGetUniformLocation(self._program, name)
+            self._uniform_locations[name] = location
+        return location
+
+    def _is_unchanged(self, name: str, value):
+        """Проверяет кэш значений и запоминает новое значение, если оно изменилось."""
+        if not self.cache_values:
+            return False
+        if isinstance(value, list):
+            value = tuple(value)
+        if name in self._uniform_values and self._uniform_values[name] == value:
+            return True
+        # Векторы и матрицы glm изменяемы, поэтому храним копию
+        self._uniform_values[name] = copy.copy(value)
+        return False
+
     def set_bool(self, name: str, value: bool):
-        location = gl.glGetUniformLocation(self._program, name)
+        if self._is_unchanged(name, value):
+            return
+        location = self._get_location(name)
         gl.glUniform1i(location, int(value))
 
     def set_int(self, name: str, value: int):
-        location = gl.glGetUniformLocation(self._program, name)
+        if self._is_unchanged(name, value):
+            return
+        location = self._get_location(name)
         gl.glUniform1i(location, value)
 
     def set_float(self, name: str, value: float):
-        location = gl.glGetUniformLocation(self._program, name)
+        if self._is_unchanged(name, value):
+            return
+        location = self._get_location(name)
         gl.glUniform1f(location, value)
 
     def set_vec2(self, name: str, value):
-        location = gl.glGetUniformLocation(self._program, name)
+        if self._is_unchanged(name, value):
+            return
+        location = self._get_location(name)
         if isinstance(value, glm.vec2):
             gl.glUniform2fv(location, 1, glm.value_ptr(value))
         else:
             gl.glUniform2f(location, *value)
 
     def set_vec3(self, name: str, value):
-        location = gl.glGetUniformLocation(self._program, name)
+        if self._is_unchanged(name, value):
+            return
+        location = self._get_location(name)
         if isinstance(value, glm.vec3):
             gl.glUniform3fv(location, 1, glm.value_ptr(value))
         else:
             gl.glUniform3f(location, *value)
 
     def set_vec4(self, name: str, value):
-        location = gl.glGetUniformLocation(self._program, name)
+        if self._is_unchanged(name, value):
+            return
+        location = self._get_location(name)
         if isinstance(value, glm.vec4):
             gl.glUniform4fv(location, 1, glm.value_ptr(value))
         else:
             gl.glUniform4f(location, *value)
 
     def set_mat2(self, name: str, mat):
-        location = gl.glGetUniformLocation(self._program, name)
+        if self._is_unchanged(name, mat):
+            return
+        location = self._get_location(name)
         gl.glUniformMatrix2fv(location, 1, gl.GL_FALSE, glm.value_ptr(mat))
 
     def set_mat3(self, name: str, mat):
-        location = gl.glGetUniformLocation(self._program, name)
+        if self._is_unchanged(name, mat):
+            return
+        location = self._get_location(name)
         gl.glUniformMatrix3fv(location, 1, gl.GL_FALSE, glm.value_ptr(mat))
 
     def set_mat4(self, name: str, mat):
-        location = gl.glGetUniformLocation(self._program, name)
+        if self._is_unchanged(name, mat):
+            return
+        location = self._get_location(name)
         gl.glUniformMatrix4fv(location, 1, gl.GL_FALSE, glm.value_ptr(mat))
 
     @staticmethod
@@ -1,100 +1,309 @@
-import math
 from typing import List
 
 import glm
+import numpy as np
 
+from particles import kernels
+from particles.broad_phase import UniformGrid
+from particles.distance_field import DistanceField
 from particles.particle import Particle
+from shapes.collider import Collider
 from shapes.shape import Shape
-from shapes.cylinder import Cylinder
+
+# Наибольшее число пар частица-коллайдер, обрабатываемых за раз в safe_time без широкой фазы
+_SAFE_TIME_PAIRS = 1 << 16
 
 
 class AntiAttractorHandler:
-    def __init__(self, objects: List[Shape], range_of_effect: float):
+    def __init__(self, objects: List[Shape], range_of_effect: float, use_broad_phase=True, cell_size=None):
         """
-        :param objects: Список объектов, выступающих в роли анти-аттракторов.
+        :param objects: Список объектов сцены. Анти-аттракторами служат коллайдеры (Collider)
+                        с включённым флагом anti_attractor.
         :param range_of_effect: Радиус действия анти-аттрактора.
+        :param use_broad_phase: Отсеивать далёкие от коллайдеров частицы с помощью равномерной сетки.
+        :param cell_size: Размер ячейки сетки широкой фазы (по умолчанию подбирается по коллайдерам).
         """
         self.objects = objects
         self.range_of_effect = range_of_effect
+        self.broad_phase = UniformGrid(cell_size) if use_broad_phase else None
+        # Коллайдеры текущего кадра. Список и широкая фаза пересчитываются,
+        # только когда меняется набор коллайдеров или collider_version какого-либо из них
+        self.colliders: List[Collider] = []
+        self._collider_versions = None
+        # Ограничивающие параллелепипеды коллайдеров (минимумы и максимумы формы (M, 3)) и номер
+        # их версии, который увеличивается при каждой перестройке
+        self.bounds_min = np.empty((0, 3), dtype=np.float32)
+        self.bounds_max = np.empty((0, 3), dtype=np.float32)
+        self.generation = 0
+        # Запечённое поле расстояний статических коллайдеров, параметры его запекания и версии
+        # запечённых коллайдеров. Отмечает коллайдеры, силы которых вычисляются аналитически
+        self.distance_field = None
+        self._distance_field_options = None
+        self._baked_versions = None
+        self.analytic = np.zeros(0, dtype=bool)
+        # Модуль ядер симуляции, см. kernels.get_backend
+        self.kernels = kernels
 
-    def apply_anti_attraction(self, particle: Particle):
-        """Обрабатывает взаимодействие частицы с анти-аттракторами."""
-        for obj in self.objects:
-            if isinstance(obj, Cylinder):
-                self.apply_force_cylinder(particle, obj)
-
-    def apply_force_cylinder(self, particle: Particle, cylinder: Cylinder):
-        """Применяет силу отталкивания от поверхности цилиндра, если частица находится в радиусе действия эффекта."""
-        # Матрицы поворота цилиндра
-        rotation_matrix = glm.mat4(1.0)
-        rotation_matrix = glm.rotate(rotation_matrix, glm.radians(cylinder.rotation[0]), glm.vec3(1.0, 0.0, 0.0))
-        rotation_matrix = glm.rotate(rotation_matrix, glm.radians(cylinder.rotation[1]), glm.vec3(0.0, 1.0, 0.0))
-        rotation_matrix = glm.rotate(rotation_matrix, glm.radians(cylinder.rotation[2]), glm.vec3(0.0, 0.0, 1.0))
-
-        # Переход частицы в локальную систему цилиндра
-        inv_rotation_matrix = glm.inverse(rotation_matrix)
-        local_particle_position = glm.vec3(inv_rotation_matrix * glm.vec4(particle.position - cylinder.position, 1.0))
-
-        # Определяем проекцию частицы на ось цилиндра
-        clamped_y = glm.clamp(local_particle_position.y, 0.0, cylinder.height)
-
-        # Радиус цилиндра на высоте проекции
-        current_radius = glm.mix(cylinder.base_radius, cylinder.top_radius, clamped_y / cylinder.height)
-
-        # Расстояние от частицы до боковой поверхности
-        to_axis = glm.vec2(local_particle_position.x, local_particle_position.z)
-        distance_to_side_surface = glm.length(to_axis) - current_radius
-
-        # Расстояние до верхнего и нижнего оснований
-        distance_to_top = local_particle_position.y - cylinder.height
-        distance_to_bottom = -local_particle_position.y
-
-        # Определяем минимальное расстояние до поверхности цилиндра
-        if local_particle_position.y > cylinder.height:
-            # Частица [...] над верхним основанием
-            if distance_to_side_surface > 0.0:
-                # где-то сбоку
-                distance_to_surface = glm.length(glm.vec2(distance_to_side_surface, distance_to_top))
-                surface_normal = glm.vec3(to_axis.x, 1.0, to_axis.y)
-            else:
-                # ровно
-                distance_to_surface = distance_to_top
-                surface_normal = glm.vec3(0.0, 1.0, 0.0)
-        elif local_particle_position.y < 0.0:
-            # Частица [...] под нижним основанием
-            if distance_to_side_surface > 0.0:
-                # где-то сбоку
-                distance_to_surface = glm.length(glm.vec2(distance_to_side_surface, distance_to_bottom))
-                surface_normal = glm.vec3(to_axis.x, -1.0, to_axis.y)
-            else:
-                # ровно
-                distance_to_surface = distance_to_bottom
-                surface_normal = glm.vec3(0.0, -1.0, 0.0)
+    def __getstate__(self):
+        # Модуль ядер не сериализуется, вместо него передаётся имя набора ядер
+        state = self.__dict__.copy()
+        state['kernels'] = self.kernels.NAME
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.kernels = kernels.get_backend(state['kernels'])
+
+    def enable_distance_field(self, resolution=64, bounds=None, use_cache=True):
+        """
+        Включает режим статической сцены: поле расстояний статических коллайдеров (Collider.static)
+        запекается в сетку (или загружается из дискового кэша), и их сила вычисляется одной трилинейной
+        выборкой на частицу. Коллайдер, изменившийся после запекания, как и добавленный позже,
+        исключается из поля и дальше отталкивает частицы аналитически поверх поля. Поле перезапекается
+        без дискового кэша только при таком исключении, а не на каждом шаге движения коллайдера.
+        Поле хранит расстояние до ближайшего коллайдера, поэтому в местах пересечения зон действия
+        запечённых коллайдеров силы не складываются.
+
+        :param resolution: Количество узлов сетки по каждой оси.
+        :param bounds: Область запекания (минимум, максимум); по умолчанию - границы коллайдеров
+                       с запасом на радиус действия.
+        :param use_cache: Хранить запечённое поле на диске между запусками.
+        """
+        self._distance_field_options = dict(resolution=resolution, bounds=bounds, use_cache=use_cache)
+        self._baked_versions = None
+        self._collider_versions = None
+
+    def update_transforms(self):
+        """Обновляет список коллайдеров и широкую фазу для текущего кадра."""
+        colliders = [obj for obj in self.objects if isinstance(obj, Collider) and obj.anti_attractor]
+        versions = [(id(collider), collider.collider_version) for collider in colliders]
+        if versions == self._collider_versions:
+            return
+        self._collider_versions = versions
+        self.colliders = colliders
+        self.generation += 1
+
+        bounds = [collider.get_bounds() for collider in colliders]
+        self.bounds_min = np.array([lower for lower, _ in bounds], dtype=np.float32).reshape(-1, 3)
+        self.bounds_max = np.array([upper for _, upper in bounds], dtype=np.float32).reshape(-1, 3)
+
+        self.analytic = np.ones(len(colliders), dtype=bool)
+        self._update_primitives(colliders)
+        if self._distance_field_options is not None:
+            self._update_distance_field(colliders, dict(versions))
+        if self.broad_phase is not None:
+            self.broad_phase.build(bounds, margin=self.range_of_effect)
+
+    def _update_primitives(self, colliders):
+        """Таблица фигур коллайдеров для скомпилированных ядер, см. Collider.sdf_primitive."""
+        count = len(colliders)
+        self.primitive_kinds = np.zeros(count, dtype=np.int64)
+        self.primitive_params = np.zeros((count, 3), dtype=np.float32)
+        self.primitive_origins = np.zeros((count, 3), dtype=np.float32)
+        self.primitive_rotations = np.zeros((count, 3, 3), dtype=np.float32)
+        self.primitive_inverse_rotations = np.zeros((count, 3, 3), dtype=np.float32)
+        for index, collider in enumerate(colliders):
+            primitive = collider.sdf_primitive()
+            if primitive is None:
+                continue
+            self.primitive_kinds[index], self.primitive_params[index] = primitive
+            self.primitive_origins[index] = collider.position
+            self.primitive_rotations[index], self.primitive_inverse_rotations[index] = \
+                collider._collider_matrices()
+
+    def _update_distance_field(self, colliders, versions):
+        """Выбирает запекаемые коллайдеры и перезапекает поле, если их набор изменился."""
+        first_bake = self._baked_versions is None
+        baked = [collider for collider in colliders if collider.static and
+                 (first_bake or self._baked_versions.get(id(collider)) == versions[id(collider)])]
+        baked_versions = {id(collider): versions[id(collider)] for collider in baked}
+        if baked_versions != self._baked_versions:
+            options = dict(self._distance_field_options)
+            # Перезапекание из-за изменения коллайдеров не сохраняется на диск
+            options['use_cache'] = options['use_cache'] and first_bake
+            self.distance_field = DistanceField.bake(baked, margin=self.range_of_effect, **options) \
+                if baked else None
+            self._baked_versions = baked_versions
+        self.analytic = np.array([id(collider) not in baked_versions for collider in colliders], dtype=bool)
+
+    def safe_time(self, positions, velocities, acceleration):
+        """
+        Время, в течение которого частицы, летящие только под действием постоянного ускорения,
+        заведомо не попадут в зону действия ни одного коллайдера, то есть в его границы, расширенные
+        на радиус действия. Частица не может войти в параллелепипед раньше, чем в каждый из трёх слоёв
+        между его гранями, а момент входа в слой находится из уравнения движения вдоль одной оси.
+        Для частиц внутри границ возвращается 0, если частица не долетит ни до одной - бесконечность.
+
+        Сначала время считается до общего параллелепипеда всех зон. Частицы внутри него проверяются
+        по широкой фазе: за время, пока частица смещается не дальше половины ячейки, она может войти
+        только в зоны коллайдеров из ячеек вокруг неё, поэтому оценка ограничивается этим временем.
+        """
+        if len(self.bounds_min) == 0:
+            return np.full(len(positions), np.inf)
+
+        influence_min = (self.bounds_min - self.range_of_effect).astype(np.float64)
+        influence_max = (self.bounds_max + self.range_of_effect).astype(np.float64)
+        positions = positions.astype(np.float64)
+        velocities = velocities.astype(np.float64)
+        acceleration = np.asarray(acceleration, dtype=np.float64)
+        result = _box_entry_time(positions, velocities, acceleration,
+                                 influence_min.min(axis=0), influence_max.max(axis=0))
+        near = np.flatnonzero(result == 0.0)
+        if len(near) == 0:
+            return result
+        positions, velocities = positions[near], velocities[near]
+
+        if self.broad_phase is None:
+            # Без широкой фазы все пары перебираются порциями ограниченного размера
+            chunk = max(1, _SAFE_TIME_PAIRS // len(influence_min))
+            for start in range(0, len(near), chunk):
+                entry = _box_entry_time(positions[start:start + chunk, None], velocities[start:start + chunk, None],
+                                        acceleration, influence_min, influence_max)
+                result[near[start:start + chunk]] = entry.min(axis=1)
+            return result
+
+        # Время, за которое частица заведомо смещается не дальше половины ячейки
+        reach = 0.5 * self.broad_phase.cell_extent
+        speed = np.linalg.norm(velocities, axis=1)
+        with np.errstate(divide='ignore'):
+            horizon = _slab_entry_time(reach, speed, np.linalg.norm(acceleration))
+        pair_particles, pair_colliders = self.broad_phase.query_boxes(positions - reach, positions + reach)
+        entry = _box_entry_time(positions[pair_particles], velocities[pair_particles], acceleration,
+                                influence_min[pair_colliders], influence_max[pair_colliders])
+        np.minimum.at(horizon, pair_particles, entry)
+        result[near] = horizon
+        return result
+
+    def clearance(self, positions, reach):
+        """
+        Оценка снизу расстояния от частиц до поверхности ближайшего коллайдера, не превышающая reach
+        (число или массив на частицу). Для коллайдеров, чей ограничивающий параллелепипед ближе reach,
+        расстояние до поверхности вычисляется точно, для остальных берётся reach. Кандидаты отбираются
+        широкой фазой по параллелепипедам частиц, расширенным на reach.
+        """
+        reach = np.broadcast_to(np.asarray(reach, dtype=np.float32), len(positions))
+        reach_squared = reach * reach
+        result = reach_squared.copy()
+        if self.broad_phase is None:
+            # Без широкой фазы пары отбираются по каждому коллайдеру
+            pair_particles, pair_colliders = [], []
+            for index, (lower, upper) in enumerate(zip(self.bounds_min, self.bounds_max)):
+                near = np.flatnonzero(_box_gap(positions, lower, upper) < reach_squared)
+                pair_particles.append(near)
+                pair_colliders.append(np.full(len(near), index))
+            pair_particles = np.concatenate(pair_particles) if pair_particles else np.zeros(0, dtype=np.int64)
+            pair_colliders = np.concatenate(pair_colliders) if pair_colliders else np.zeros(0, dtype=np.int64)
         else:
-            # Частица где-то сбоку
-            distance_to_surface = distance_to_side_surface
-            surface_normal = glm.vec3(to_axis.x, 0.0, to_axis.y)
+            extent = reach[:, None]
+            pair_particles, pair_colliders = self.broad_phase.query_boxes(positions - extent, positions + extent)
+            gap = _box_gap(positions[pair_particles], self.bounds_min[pair_colliders], self.bounds_max[pair_colliders])
+            near = gap < reach_squared[pair_particles]
+            pair_particles, pair_colliders = pair_particles[near], pair_colliders[near]
+
+        # Точное расстояние для пар, у которых параллелепипед коллайдера ближе reach
+        order = np.argsort(pair_colliders, kind='stable')
+        pair_particles, pair_colliders = pair_particles[order], pair_colliders[order]
+        colliders, starts = np.unique(pair_colliders, return_index=True)
+        for collider, particles in zip(colliders, np.split(pair_particles, starts[1:])):
+            distance, _ = self.colliders[collider].signed_distance(positions[particles],
+                                                                   float(reach[particles].max()))
+            # За пределами max_distance коллайдер может вернуть бесконечность, тогда остаётся reach
+            np.minimum.at(result, particles, distance * distance)
+        return np.sqrt(result, out=result)
+
+    def apply_anti_attraction(self, particle: Particle):
+        """Обрабатывает взаимодействие одной частицы с анти-аттракторами."""
+        position = np.array([particle.position], dtype=np.float32)
+        velocity = np.array([particle.velocity], dtype=np.float32)
+        self.update_transforms()
+        for collider in self.colliders:
+            self.apply_force_batch(position, velocity, collider)
+        particle.velocity = glm.vec3(*velocity[0])
 
-        # Проверяем, находится ли частица в зоне действия эффекта
-        if abs(distance_to_surface) > self.range_of_effect:
+    def apply_anti_attraction_batch(self, positions, velocities):
+        """
+        Применяет силы отталкивания всех коллайдеров к массивам позиций и скоростей формы (N, 3).
+        Скорости изменяются на месте. Перед вызовом в кадре должен быть вызван update_transforms.
+        """
+        if len(positions) == 0 or not self.colliders:
             return
 
-        # Возвращаем нормаль в мировую систему координат
-        world_normal = glm.normalize(glm.vec3(rotation_matrix * glm.vec4(surface_normal, 0.0)))
+        if self.distance_field is not None:
+            self.kernels.apply_distance_field_force(self.distance_field, positions, velocities, self.range_of_effect)
+            if not self.analytic.any():
+                return
 
-        # Вычисляем величину силы отталкивания
-        force_magnitude = self.calculate_force_magnitude_for_cylinder(particle, distance_to_surface)
+        # Коллайдеры, не запечённые в поле, отталкивают частицы аналитически
+        if self.broad_phase is None:
+            for collider, analytic in zip(self.colliders, self.analytic):
+                if analytic:
+                    self.apply_force_batch(positions, velocities, collider)
+            return
 
-        # Применяем силу отталкивания
-        particle.velocity += world_normal * force_magnitude
+        # Широкая фаза: пары частиц и коллайдеров, расширенные границы которых содержат частицу
+        pair_particles, pair_colliders = self.broad_phase.query(positions)
+        if self.distance_field is not None:
+            analytic = self.analytic[pair_colliders]
+            pair_particles, pair_colliders = pair_particles[analytic], pair_colliders[analytic]
+        if len(pair_particles) == 0:
+            return
+        # Точная фаза только для пар-кандидатов
+        self.kernels.apply_collider_forces(self, positions, velocities, pair_particles, pair_colliders)
 
-    def calculate_force_magnitude_for_cylinder(self, particle: Particle, distance_to_surface: float):
+    def apply_force_batch(self, positions, velocities, collider: Collider, indices=None):
         """
-        Вычисляет величину силы отталкивания в зависимости от расстояния до поверхности цилиндра.
-        Используется экспоненциальное затухание для плавного уменьшения силы с расстоянием.
+        Применяет силу отталкивания от поверхности коллайдера ко всем частицам (или только к частицам
+        с номерами indices), находящимся в радиусе действия эффекта.
         """
-        if abs(distance_to_surface) > self.range_of_effect:
-            return 0.0
+        if indices is not None:
+            positions = positions[indices]
+
+        distance_to_surface, normal = collider.signed_distance(positions, self.range_of_effect)
+        self.apply_force(velocities, distance_to_surface, normal, indices)
+
+    def apply_force(self, velocities, distance_to_surface, normal, indices=None):
+        """Добавляет к скоростям частиц в зоне действия силу вдоль нормали поверхности."""
+        # Отбираем частицы в зоне действия эффекта
+        affected = np.abs(distance_to_surface) <= self.range_of_effect
+        if not affected.any():
+            return
+
+        force = normal[affected] * self.calculate_force_magnitude(distance_to_surface[affected])[:, None]
+        if indices is not None:
+            affected = indices[affected]
+        velocities[affected] += force
 
+    def calculate_force_magnitude(self, distance_to_surface):
+        """
+        Вычисляет величину силы отталкивания в зависимости от расстояния до поверхности.
+        Используется экспоненциальное затухание для плавного уменьшения силы с расстоянием.
+        """
         # Экспоненциальное затухание: сила затухает плавно по формуле F = e^(-distance^2 / range_of_effect)
-        return math.exp(-distance_to_surface ** 2 / self.range_of_effect)
+        return np.exp(-distance_to_surface ** 2 / self.range_of_effect)
+
+
+def _box_gap(positions, lower, upper):
+    """Квадрат расстояния от точек до параллелепипедов [lower, upper] (0 внутри)."""
+    offset = positions - np.clip(positions, lower, upper)
+    return np.einsum('ij,ij->i', offset, offset)
+
+
+def _box_entry_time(positions, velocities, acceleration, lower, upper):
+    """Моменты входа частиц в параллелепипеды [lower, upper] (0 внутри); массивы согласуются по правилам NumPy."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Ниже слоя частица движется к нему с v и a, выше - с -v и -a
+        below = _slab_entry_time(lower - positions, velocities, acceleration)
+        above = _slab_entry_time(positions - upper, -velocities, -acceleration)
+    entry = np.where(positions < lower, below, np.where(positions > upper, above, 0.0))
+    return entry.max(axis=-1)
+
+
+def _slab_entry_time(gap, velocity, acceleration):
+    """
+    Первый момент t > 0, когда velocity·t + acceleration·t²/2 достигает gap > 0 (бесконечность,
+    если не достигает). Корень уравнения записан в виде 2·gap / (v + sqrt(v² + 2·a·gap)), устойчивом
+    при малом ускорении; отрицательный знаменатель означает, что частица удаляется от слоя.
+    """
+    root = np.sqrt(velocity * velocity + 2.0 * acceleration * gap)
+    time = 2.0 * gap / (velocity + root)
+    return np.where(time > 0.0, time, np.inf)
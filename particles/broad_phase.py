@@ -0,0 +1,160 @@
+import numpy as np
+
+
+class UniformGrid:
+    """
+    Широкая фаза поиска столкновений: равномерная сетка, в ячейки которой вписаны ограничивающие
+    параллелепипеды коллайдеров. Частицы распределяются по ячейкам одним векторным проходом,
+    и до точной проверки доходят только пары «частица - коллайдер» из общей ячейки.
+    """
+    def __init__(self, cell_size=None):
+        """
+        :param cell_size: Размер ячейки. По умолчанию - средний размер расширенного коллайдера.
+        """
+        self.cell_size = cell_size
+        self.origin = np.zeros(3, dtype=np.float32)
+        self.dims = np.zeros(3, dtype=np.int64)
+        self._cell_size = 1.0
+        # Отсортированные ключи ячеек и номера коллайдеров в них
+        self.cell_keys = np.zeros(0, dtype=np.int64)
+        self.cell_colliders = np.zeros(0, dtype=np.int64)
+        # Расширенные ограничивающие параллелепипеды коллайдеров
+        self.bounds_min = np.zeros((0, 3), dtype=np.float32)
+        self.bounds_max = np.zeros((0, 3), dtype=np.float32)
+
+    def build(self, bounds, margin=0.0):
+        """
+        Заполняет сетку коллайдерами.
+
+        :param bounds: Список пар (минимум, максимум) ограничивающих параллелепипедов коллайдеров.
+        :param margin: Расширение параллелепипедов во все стороны, например радиус действия силы.
+        """
+        self.cell_keys = np.zeros(0, dtype=np.int64)
+        self.cell_colliders = np.zeros(0, dtype=np.int64)
+        if not bounds:
+            self.bounds_min = np.zeros((0, 3), dtype=np.float32)
+            self.bounds_max = np.zeros((0, 3), dtype=np.float32)
+            return
+
+        self.bounds_min = np.array([lower for lower, _ in bounds], dtype=np.float32) - margin
+        self.bounds_max = np.array([upper for _, upper in bounds], dtype=np.float32) + margin
+
+        extents = self.bounds_max - self.bounds_min
+        self._cell_size = self.cell_size if self.cell_size else max(float(extents.max(axis=1).mean()), 1e-6)
+        self.origin = self.bounds_min.min(axis=0)
+        self.dims = np.floor((self.bounds_max.max(axis=0) - self.origin) / self._cell_size).astype(np.int64) + 1
+
+        first_cells = self._cell_coordinates(self.bounds_min)
+        last_cells = self._cell_coordinates(self.bounds_max)
+        keys = []
+        colliders = []
+        for collider, (first, last) in enumerate(zip(first_cells, last_cells)):
+            cells = np.stack(np.meshgrid(*(np.arange(first[axis], last[axis] + 1) for axis in range(3)),
+                                         indexing='ij'), axis=-1).reshape(-1, 3)
+            keys.append(self._cell_keys(cells))
+            colliders.append(np.full(len(cells), collider, dtype=np.int64))
+        keys = np.concatenate(keys)
+        colliders = np.concatenate(colliders)
+
+        order = np.argsort(keys, kind='stable')
+        self.cell_keys = keys[order]
+        self.cell_colliders = colliders[order]
+
+    def query(self, positions):
+        """
+        Возвращает пары кандидатов (индексы частиц, индексы коллайдеров), в которых частица лежит
+        внутри расширенного параллелепипеда коллайдера. Каждая пара встречается не более одного раза.
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        if len(self.cell_keys) == 0 or len(positions) == 0:
+            return empty, empty
+
+        cells = self._cell_coordinates(positions)
+        inside = np.all((cells >= 0) & (cells < self.dims), axis=1)
+        particles = np.flatnonzero(inside)
+        keys = self._cell_keys(cells[particles])
+
+        # Диапазоны коллайдеров в ячейке каждой частицы
+        left = np.searchsorted(self.cell_keys, keys, side='left')
+        right = np.searchsorted(self.cell_keys, keys, side='right')
+        counts = right - left
+        total = int(counts.sum())
+        if total == 0:
+            return empty, empty
+
+        # Разворачиваем диапазоны в плоский список пар
+        pair_particles = np.repeat(particles, counts)
+        range_starts = np.repeat(left - (np.cumsum(counts) - counts), counts)
+        pair_colliders = self.cell_colliders[np.arange(total) + range_starts]
+
+        # Точная проверка попадания в расширенный параллелепипед
+        pair_positions = positions[pair_particles]
+        overlap = np.all((pair_positions >= self.bounds_min[pair_colliders]) &
+                         (pair_positions <= self.bounds_max[pair_colliders]), axis=1)
+        return pair_particles[overlap], pair_colliders[overlap]
+
+    def query_boxes(self, lower, upper):
+        """
+        Возвращает пары (индексы параллелепипедов, индексы коллайдеров), в которых параллелепипед
+        [lower, upper] (массивы формы (K, 3)) пересекается с расширенным параллелепипедом коллайдера.
+        Параллелепипеды перебирают все занятые ими ячейки, поэтому они не должны быть много больше ячейки.
+        Пары упорядочены по параллелепипедам и встречаются не более одного раза.
+        """
+        empty = np.zeros(0, dtype=np.int64)
+        if len(self.cell_keys) == 0 or len(lower) == 0:
+            return empty, empty
+
+        first = self._cell_coordinates(lower)
+        last = self._cell_coordinates(upper)
+        boxes = np.flatnonzero(np.all((last >= 0) & (first < self.dims), axis=1))
+        first = np.clip(first[boxes], 0, self.dims - 1)
+        last = np.clip(last[boxes], 0, self.dims - 1)
+
+        # Все ячейки каждого параллелепипеда одним плоским списком
+        spans = last - first + 1
+        counts = np.prod(spans, axis=1)
+        single_cell = bool(np.all(counts == 1))
+        if single_cell:
+            cell_boxes, cells = boxes, first
+        else:
+            total = int(counts.sum())
+            cell_boxes = np.repeat(boxes, counts)
+            offset = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            spans = np.repeat(spans, counts, axis=0)
+            cells = np.repeat(first, counts, axis=0)
+            cells[:, 0] += offset % spans[:, 0]
+            cells[:, 1] += offset // spans[:, 0] % spans[:, 1]
+            cells[:, 2] += offset // (spans[:, 0] * spans[:, 1])
+        keys = self._cell_keys(cells)
+
+        # Коллайдеры каждой ячейки, как в query
+        left = np.searchsorted(self.cell_keys, keys, side='left')
+        right = np.searchsorted(self.cell_keys, keys, side='right')
+        counts = right - left
+        total = int(counts.sum())
+        if total == 0:
+            return empty, empty
+        pair_boxes = np.repeat(cell_boxes, counts)
+        range_starts = np.repeat(left - (np.cumsum(counts) - counts), counts)
+        pair_colliders = self.cell_colliders[np.arange(total) + range_starts]
+
+        # Точная проверка пересечения и удаление повторов из соседних ячеек
+        overlap = np.all((lower[pair_boxes] <= self.bounds_max[pair_colliders]) &
+                         (upper[pair_boxes] >= self.bounds_min[pair_colliders]), axis=1)
+        pair_boxes, pair_colliders = pair_boxes[overlap], pair_colliders[overlap]
+        if single_cell:
+            return pair_boxes, pair_colliders
+        colliders = len(self.bounds_min)
+        pairs = np.unique(pair_boxes * colliders + pair_colliders)
+        return pairs // colliders, pairs % colliders
+
+    @property
+    def cell_extent(self):
+        """Размер ячейки построенной сетки."""
+        return self._cell_size
+
+    def _cell_coordinates(self, points):
+        return np.floor((points - self.origin) / self._cell_size).astype(np.int64)
+
+    def _cell_keys(self, cells):
+        return cells[:, 0] + self.dims[0] * (cells[:, 1] + self.dims[1] * cells[:, 2])
@@ -0,0 +1,115 @@
+import os
+import zipfile
+
+import numpy as np
+
+from cache import get_cache_path, hash_key
+
+
+class DistanceField:
+    """
+    Запечённое в трёхмерную сетку знаковое расстояние до ближайшего из статических коллайдеров
+    вместе с его градиентом. Значения между узлами восстанавливаются трилинейной интерполяцией.
+    """
+    # Версия формата кэша: увеличивается при изменении способа запекания
+    CACHE_VERSION = 2
+
+    def __init__(self, field, bounds_min, bounds_max):
+        """
+        :param field: Массив формы (nx, ny, nz, 4): расстояние и градиент в узлах сетки.
+        :param bounds_min: Мировые координаты первого узла сетки.
+        :param bounds_max: Мировые координаты последнего узла сетки.
+        """
+        self.field = field
+        self.bounds_min = np.asarray(bounds_min, dtype=np.float32)
+        self.bounds_max = np.asarray(bounds_max, dtype=np.float32)
+        self.resolution = np.array(field.shape[:3])
+
+    @classmethod
+    def bake(cls, colliders, resolution=64, bounds=None, margin=0.0, use_cache=True):
+        """
+        Запекает поле расстояний коллайдеров или загружает его из дискового кэша.
+
+        :param colliders: Коллайдеры (Collider), геометрия которых не меняется.
+        :param resolution: Количество узлов по каждой оси (число или тройка чисел).
+        :param bounds: Область запекания (минимум, максимум). По умолчанию - объединение
+                       ограничивающих параллелепипедов коллайдеров, расширенное на margin.
+        :param use_cache: Сохранять результат на диск и переиспользовать при следующем запуске.
+        """
+        resolution = tuple(int(n) for n in np.broadcast_to(resolution, 3))
+        if bounds is None:
+            all_bounds = [collider.get_bounds() for collider in colliders]
+            bounds_min = np.min([lower for lower, _ in all_bounds], axis=0) - margin
+            bounds_max = np.max([upper for _, upper in all_bounds], axis=0) + margin
+        else:
+            bounds_min, bounds_max = (np.asarray(bound, dtype=np.float32) for bound in bounds)
+
+        path = None
+        if use_cache:
+            key = hash_key(cls.CACHE_VERSION, [collider.geometry_signature() for collider in colliders],
+                           resolution, bounds_min.tolist(), bounds_max.tolist())
+            path = get_cache_path('distance_fields', key, 'npz')
+            if os.path.exists(path):
+                # Нечитаемый файл кэша (например, обрезанный прерванной записью) считается промахом и перезаписывается
+                try:
+                    with np.load(path) as data:
+                        return cls(data['field'], data['bounds_min'], data['bounds_max'])
+                except (OSError, ValueError, EOFError, KeyError, zipfile.BadZipFile):
+                    pass
+
+        axes = [np.linspace(bounds_min[axis], bounds_max[axis], resolution[axis], dtype=np.float32)
+                for axis in range(3)]
+        points = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, 3)
+
+        # Объединение полей: минимум расстояния и градиент ближайшего коллайдера
+        field = np.empty((len(points), 4), dtype=np.float32)
+        field[:, 0] = np.inf
+        field[:, 1:] = 0.0
+        for collider in colliders:
+            distance, gradient = collider.signed_distance(points)
+            closer = distance < field[:, 0]
+            field[closer, 0] = distance[closer]
+            field[closer, 1:] = gradient[closer]
+        field = field.reshape(*resolution, 4)
+
+        if path is not None:
+            # Запись через временный файл своего процесса, чтобы прерванное или параллельное запекание
+            # не оставило повреждённый кэш. Файл открывается явно, иначе np.savez добавит расширение .npz
+            temporary_path = f'{path}.{os.getpid()}.tmp'
+            with open(temporary_path, 'wb') as file:
+                np.savez(file, field=field, bounds_min=bounds_min, bounds_max=bounds_max)
+            os.replace(temporary_path, path)
+        return cls(field, bounds_min, bounds_max)
+
+    def sample(self, points):
+        """
+        Трилинейная выборка расстояния и градиента для массива точек формы (N, 3).
+        Для точек вне области запекания расстояние равно бесконечности, а градиент нулевой.
+        """
+        cells = self.resolution - 1
+        coordinates = (points - self.bounds_min) / (self.bounds_max - self.bounds_min) * cells
+        inside = np.all((coordinates >= 0.0) & (coordinates <= cells), axis=1)
+
+        distance = np.full(len(points), np.inf, dtype=np.float32)
+        gradient = np.zeros((len(points), 3), dtype=np.float32)
+        if not inside.any():
+            return distance, gradient
+
+        coordinates = coordinates[inside]
+        base = np.minimum(np.floor(coordinates).astype(np.int64), np.maximum(cells - 1, 0))
+        fraction = (coordinates - base).astype(np.float32)
+
+        # Сумма восьми соседних узлов с трилинейными весами
+        values = np.zeros((len(coordinates), 4), dtype=np.float32)
+        for corner in range(8):
+            offset = np.array([(corner >> 2) & 1, (corner >> 1) & 1, corner & 1])
+            weight = np.prod(np.where(offset, fraction, 1.0 - fraction), axis=1)
+            index = base + offset
+            values += self.field[index[:, 0], index[:, 1], index[:, 2]] * weight[:, None]
+
+        distance[inside] = values[:, 0]
+        interpolated = values[:, 1:]
+        length = np.linalg.norm(interpolated, axis=1, keepdims=True)
+        np.divide(interpolated, length, out=interpolated, where=length > 0.0)
+        gradient[inside] = interpolated
+        return distance, gradient
@@ -0,0 +1,77 @@
+import math
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+class DirectionDistribution(ABC):
+    """
+    Распределение направлений испускания частиц. Направления генерируются сразу пачкой
+    и всегда имеют единичную длину: нормализация случайных векторов не используется,
+    поэтому вырожденных (нулевых) векторов и NaN не бывает.
+    """
+    @abstractmethod
+    def sample(self, rng: np.random.Generator, count):
+        """Возвращает count единичных векторов в виде массива формы (count, 3)."""
+        pass
+
+
+class UniformSphere(DirectionDistribution):
+    """Равномерное распределение по всей сфере направлений."""
+    def sample(self, rng, count):
+        # По теореме Архимеда проекция на ось равномерна на [-1, 1]
+        z = rng.uniform(-1.0, 1.0, count)
+        phi = rng.uniform(0.0, 2.0 * math.pi, count)
+        return _from_spherical(z, phi)
+
+
+class Cone(DirectionDistribution):
+    """Равномерное распределение внутри конуса вокруг оси axis с половинным углом раствора в градусах."""
+    def __init__(self, axis=(0.0, 1.0, 0.0), half_angle=30.0):
+        self.axis = axis
+        self.half_angle = half_angle
+        self._basis = _orthonormal_basis(axis)
+
+    def sample(self, rng, count):
+        min_cos = math.cos(math.radians(self.half_angle))
+        z = rng.uniform(min_cos, 1.0, count)
+        phi = rng.uniform(0.0, 2.0 * math.pi, count)
+        return _from_spherical(z, phi) @ self._basis
+
+
+class Hemisphere(Cone):
+    """Равномерное распределение по полусфере, обращённой в сторону оси axis."""
+    def __init__(self, axis=(0.0, 1.0, 0.0)):
+        super().__init__(axis, half_angle=90.0)
+
+
+class Disk(DirectionDistribution):
+    """Равномерное распределение направлений в плоскости, перпендикулярной оси axis."""
+    def __init__(self, axis=(0.0, 1.0, 0.0)):
+        self.axis = axis
+        self._basis = _orthonormal_basis(axis)
+
+    def sample(self, rng, count):
+        phi = rng.uniform(0.0, 2.0 * math.pi, count)
+        return _from_spherical(np.zeros(count), phi) @ self._basis
+
+
+def _from_spherical(z, phi):
+    """Единичные векторы по проекции на ось Z и азимуту."""
+    radius = np.sqrt(np.maximum(0.0, 1.0 - z * z))
+    return np.stack([radius * np.cos(phi), radius * np.sin(phi), z], axis=1)
+
+
+def _orthonormal_basis(axis):
+    """Матрица, строки которой - два перпендикулярных оси вектора и сама ось (для умножения справа)."""
+    axis = np.asarray(axis, dtype=np.float64)
+    length = np.linalg.norm(axis)
+    if length == 0.0:
+        raise ValueError('direction axis must be non-zero')
+    axis = axis / length
+    # Вспомогательный вектор, заведомо не коллинеарный оси
+    helper = np.array([1.0, 0.0, 0.0]) if abs(axis[0]) < 0.9 else np.array([0.0, 1.0, 0.0])
+    tangent = np.cross(axis, helper)
+    tangent /= np.linalg.norm(tangent)
+    bitangent = np.cross(axis, tangent)
+    return np.stack([tangent, bitangent, axis])
@@ -1,10 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import List
 
 import glm
+import numpy as np
 
-from materials.shader import Shader
-from particles.particle import Particle
+from particles import kernels
+from particles.particle_buffer import ParticleBuffer
 
 
 class Emitter(ABC):
@@ -12,37 +12,101 @@ class Emitter(ABC):
         self.position = glm.vec3(*position)
         self.emission_rate = emission_rate  # Частота эмиссии (частиц в секунду)
         self.max_particles = max_particles
-        self.particles: List[Particle] = []
+        self.buffer = ParticleBuffer(max_particles)
         self.accumulator = 0.0  # Накопитель времени
         self.transparency_radius = transparency_radius
         self.acceleration = [0.0, -9.81, 0.0] if acceleration is None else acceleration
+        # Модуль ядер симуляции, см. kernels.get_backend
+        self.kernels = kernels
+        # Шаг последнего обновления: по нему вычисляются предыдущие позиции свободно летящих частиц
+        self.last_delta_time = 0.0
+
+    @property
+    def particles(self):
+        """Частицы эмиттера в виде последовательности объектов с интерфейсом Particle."""
+        self.materialize()
+        return self.buffer
 
     @abstractmethod
     def emit_particle(self):
         pass
 
+    def emit_batch(self, count):
+        """
+        Добавляет в хранилище count новых частиц (count не больше числа свободных слотов).
+        Эмиттеры с векторной генерацией частиц переопределяют этот метод.
+        """
+        for _ in range(count):
+            self.buffer.append(self.emit_particle())
+
     def set_transparency_radius(self, transparency_radius):
         self.transparency_radius = transparency_radius if transparency_radius >= 0.0 else 0.0
 
     def update(self, delta_time):
-        # Эмиссия новых частиц
+        self.emit(delta_time)
+        self.integrate(delta_time)
+        self.update_trails()
+        self.remove_dead()
+
+    def emit(self, delta_time):
+        """Эмиссия новых частиц, накопленных за delta_time."""
         self.accumulator += self.emission_rate * delta_time
         particles_to_emit = int(self.accumulator)
 
-        for _ in range(particles_to_emit):
-            if len(self.particles) < self.max_particles:
-                self.particles.append(self.emit_particle())
+        # Частицы сверх вместимости хранилища не испускаются
+        count = min(particles_to_emit, self.buffer.capacity - self.buffer.count)
+        if count > 0:
+            self.emit_batch(count)
 
         self.accumulator -= particles_to_emit
 
-        # Обновление существующих частиц
-        alive_particles = []
-        for particle in self.particles:
-            particle.update(delta_time, self.acceleration)
-            if particle.is_alive():
-                alive_particles.append(particle)
-        self.particles = alive_particles
-
-    def render(self, shader: Shader):
-        for particle in self.particles:
-            particle.render(shader)
+    def integrate(self, delta_time):
+        """
+        Продвигает все живые частицы эмиттера за один векторный проход. Свободно летящие частицы
+        (см. ParticleBuffer.anchor) только стареют; те, чьё время свободного полёта истекло,
+        возвращаются к пошаговому интегрированию.
+        """
+        buffer = self.buffer
+        count = buffer.count
+        self.last_delta_time = delta_time
+        free = buffer.free_mask()
+        if not free.any():
+            buffer.previous_position[:count] = buffer.position[:count]
+            self.kernels.integrate(buffer.position[:count], buffer.velocity[:count], buffer.age[:count],
+                                   self.acceleration, delta_time)
+            return
+
+        bound = np.flatnonzero(~free)
+        position, velocity, age = buffer.position[bound], buffer.velocity[bound], buffer.age[bound]
+        buffer.previous_position[bound] = position
+        self.kernels.integrate(position, velocity, age, self.acceleration, delta_time)
+        buffer.position[bound], buffer.velocity[bound] = position, velocity
+        buffer.age[:count] += delta_time
+
+        free &= buffer.age[:count] >= buffer.free_until[:count]
+        buffer.release(free, self.acceleration, delta_time)
+
+    def materialize(self):
+        """Вычисляет текущие позиции и скорости свободно летящих частиц перед их чтением или отрисовкой."""
+        self.buffer.materialize(self.acceleration, self.last_delta_time)
+
+    def update_trails(self):
+        """Добавляет текущие позиции частиц в их следы."""
+        buffer = self.buffer
+        count = buffer.count
+        # Следы свободно летящих частиц требуют их позиций на каждом шаге
+        trail_free = buffer.free_mask() & ((buffer.flags[:count] & buffer.FLAG_TRAIL) != 0)
+        buffer.materialize(self.acceleration, self.last_delta_time, trail_free, positions_only=True)
+        self.kernels.push_trails(buffer.trails, buffer.position[:count])
+
+    def remove_dead(self):
+        """Удаляет частицы, чьё время жизни истекло."""
+        self.buffer.remove_dead()
+
+    def render(self, renderer, alpha=1.0):
+        """
+        :param renderer: Отрисовщик с контекстом OpenGL, например ParticleRenderer.
+        :param alpha: Доля шага для интерполяции между двумя последними состояниями.
+        """
+        self.materialize()
+        renderer.draw(self.buffer, alpha)
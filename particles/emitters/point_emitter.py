@@ -1,14 +1,20 @@
-import random
-
 import glm
+import numpy as np
 
+from particles.distributions import DirectionDistribution, UniformSphere
 from particles.emitter import Emitter
 from particles.particle import Particle
+from particles.particle_buffer import ParticleBuffer
 
 
 class PointEmitter(Emitter):
     def __init__(self, position, emission_rate, max_particles, speed_range, size_range, color,
-                 lifetime, color_fading=False, transparency_radius=None, has_trail=False):
+                 lifetime, color_fading=False, transparency_radius=None, has_trail=False, seed=None,
+                 direction_distribution: DirectionDistribution = None):
+        """
+        :param direction_distribution: Распределение направлений испускания, по умолчанию равномерное по сфере.
+        :param seed: Зерно генератора случайных чисел; при одинаковом зерне эмиссия воспроизводима.
+        """
         super().__init__(position, emission_rate, max_particles, transparency_radius=transparency_radius)
         self.speed_range = speed_range  # (min_speed, max_speed)
         self.size_range = size_range  # (min_size, max_size)
@@ -17,18 +23,18 @@ class PointEmitter(Emitter):
         self.lifetime = lifetime
         self.color_fading = color_fading
         self.has_trail = has_trail
+        self.direction_distribution = direction_distribution if direction_distribution else UniformSphere()
+        self.rng = np.random.default_rng(seed)
+
+    def random_velocities(self, count):
+        """Случайные начальные скорости: направление и модуль скорости для count частиц."""
+        speed = self.rng.uniform(self.speed_range[0], self.speed_range[1], count)
+        direction = self.direction_distribution.sample(self.rng, count)
+        return direction * speed[:, None]
 
     def emit_particle(self):
-        # Случайные начальная скорость и направление
-        speed = random.uniform(self.speed_range[0], self.speed_range[1])
-        direction = glm.vec3(
-            random.uniform(-1.0, 1.0),
-            random.uniform(-1.0, 1.0),
-            random.uniform(-1.0, 1.0)
-        )
-        direction = glm.normalize(direction)
-        velocity = direction * speed
-        size = random.uniform(self.size_range[0], self.size_range[1])
+        velocity = self.random_velocities(1)[0]
+        size = self.rng.uniform(self.size_range[0], self.size_range[1])
         return Particle(
             position=self.position,
             velocity=velocity,
@@ -39,3 +45,27 @@ class PointEmitter(Emitter):
             transparency_radius=self.transparency_radius,
             has_trail=self.has_trail
         )
+
+    def emit_batch(self, count):
+        """Генерирует все частицы кадра одной серией векторных операций прямо в слоты хранилища."""
+        buffer = self.buffer
+        slots = buffer.allocate(count)
+        count = slots.stop - slots.start
+
+        buffer.position[slots] = self.position
+        buffer.previous_position[slots] = self.position
+        buffer.start_position[slots] = self.position
+        buffer.velocity[slots] = self.random_velocities(count)
+        buffer.size[slots] = self.rng.uniform(self.size_range[0], self.size_range[1], count)
+        buffer.color[slots] = self.color
+        buffer.age[slots] = 0.0
+        buffer.lifetime[slots] = self.lifetime
+        buffer.transparency_radius[slots] = np.nan if self.transparency_radius is None \
+            else self.transparency_radius
+        flags = 0
+        if self.color_fading:
+            flags |= ParticleBuffer.FLAG_COLOR_FADING
+        if self.has_trail:
+            flags |= ParticleBuffer.FLAG_TRAIL
+        buffer.flags[slots] = flags
+        buffer.trails.positions[slots] = self.position
@@ -0,0 +1,71 @@
+import sys
+import warnings
+
+import numpy as np
+
+NAME = 'numpy'
+
+
+def integrate(position, velocity, age, acceleration, delta_time):
+    """
+    Продвигает частицы на шаг delta_time при постоянном ускорении за один проход по массивам.
+    Массивы изменяются на месте; формулы совпадают с Particle.update.
+    """
+    acceleration = np.asarray(acceleration, dtype=position.dtype)
+    position += velocity * delta_time
+    position += acceleration * (delta_time ** 2 / 2)
+    velocity += acceleration * delta_time
+    age += delta_time
+
+
+def push_trails(trails, positions):
+    """Добавляет позиции частиц в кольцевой буфер следов."""
+    trails.push(positions)
+
+
+def apply_distance_field_force(distance_field, positions, velocities, range_of_effect):
+    """Выборка запечённого поля расстояний и сила отталкивания, как в AntiAttractorHandler.apply_force."""
+    distance, normal = distance_field.sample(positions)
+    affected = np.abs(distance) <= range_of_effect
+    velocities[affected] += normal[affected] * np.exp(-distance[affected] ** 2 / range_of_effect)[:, None]
+
+
+def apply_collider_forces(handler, positions, velocities, pair_particles, pair_colliders):
+    """
+    Точная фаза отталкивания для пар-кандидатов (частица, коллайдер) широкой фазы:
+    пары группируются по коллайдерам, и каждый коллайдер обрабатывает своих кандидатов одним вызовом.
+    """
+    order = np.argsort(pair_colliders, kind='stable')
+    pair_particles = pair_particles[order]
+    colliders, starts = np.unique(pair_colliders[order], return_index=True)
+    ends = np.append(starts[1:], len(pair_particles))
+    for collider, start, end in zip(colliders, starts, ends):
+        handler.apply_force_batch(positions, velocities, handler.colliders[collider],
+                                  indices=pair_particles[start:end])
+
+
+def set_threads(threads):
+    """Ядра NumPy выполняются в одном потоке, параметр игнорируется."""
+    pass
+
+
+def get_threads():
+    """Действующее количество потоков ядер."""
+    return 1
+
+
+def get_backend(name='numpy'):
+    """
+    Модуль с ядрами симуляции: 'numpy' - этот модуль, 'numba' - particles.kernels_numba.
+    Если numba не установлена, выдаётся предупреждение и используются ядра NumPy.
+    """
+    if name == NAME:
+        return sys.modules[__name__]
+    if name == 'numba':
+        try:
+            from particles import kernels_numba
+        except ImportError:
+            warnings.warn('numba is not installed, falling back to NumPy kernels')
+            return get_backend(NAME)
+        return kernels_numba
+    raise ValueError(f'unknown kernel backend: {name}')
@@ -0,0 +1,209 @@
+"""
+Ядра симуляции частиц, скомпилированные numba. Циклы по частицам распределяются по потокам
+(parallel=True) и выполняются без GIL. Формулы совпадают с particles.kernels.
+Модуль импортируется, только если numba установлена, см. kernels.get_backend.
+"""
+import math
+import warnings
+
+import numba
+import numpy as np
+
+from particles import kernels as numpy_kernels
+from shapes import sdf
+
+NAME = 'numba'
+
+
+@numba.njit(parallel=True, nogil=True, cache=True)
+def _integrate(position, velocity, age, acceleration, delta_time):
+    # Шаг в одинарной точности и тот же порядок сложений, что и в ядре NumPy, чтобы результаты совпадали
+    dt = np.float32(delta_time)
+    half_dt2 = np.float32(delta_time ** 2 / 2)
+    for i in numba.prange(position.shape[0]):
+        for axis in range(3):
+            position[i, axis] += velocity[i, axis] * dt
+            position[i, axis] += acceleration[axis] * half_dt2
+            velocity[i, axis] += acceleration[axis] * dt
+        age[i] += delta_time
+
+
+def integrate(position, velocity, age, acceleration, delta_time):
+    """Продвигает частицы на шаг delta_time при постоянном ускорении, массивы изменяются на месте."""
+    _integrate(position, velocity, age, np.asarray(acceleration, dtype=position.dtype), delta_time)
+
+
+@numba.njit(parallel=True, nogil=True, cache=True)
+def _push_trails(trail_positions, positions, cursor):
+    for i in numba.prange(positions.shape[0]):
+        for axis in range(3):
+            trail_positions[i, cursor, axis] = positions[i, axis]
+
+
+def push_trails(trails, positions):
+    """Добавляет позиции частиц в кольцевой буфер следов, как TrailBuffer.push."""
+    _push_trails(trails.positions, positions, trails.cursor)
+    trails.cursor = (trails.cursor + 1) % trails.length
+
+
+@numba.njit(nogil=True, cache=True)
+def _grid_cell(position, bound_min, bound_max, cells):
+    """Номер ячейки сетки и доля внутри неё вдоль одной оси; номер -1 - точка вне сетки."""
+    coordinate = (position - bound_min) / (bound_max - bound_min) * cells
+    if not 0.0 <= coordinate <= cells:
+        return -1, 0.0
+    cell = min(int(math.floor(coordinate)), max(cells - 1, 0))
+    return cell, coordinate - cell
+
+
+@numba.njit(parallel=True, nogil=True, cache=True)
+def _apply_distance_field_force(field, bounds_min, bounds_max, positions, velocities, range_of_effect):
+    for i in numba.prange(positions.shape[0]):
+        # Точки вне области запекания не испытывают силы
+        x, fx = _grid_cell(positions[i, 0], bounds_min[0], bounds_max[0], field.shape[0] - 1)
+        y, fy = _grid_cell(positions[i, 1], bounds_min[1], bounds_max[1], field.shape[1] - 1)
+        z, fz = _grid_cell(positions[i, 2], bounds_min[2], bounds_max[2], field.shape[2] - 1)
+        if x < 0 or y < 0 or z < 0:
+            continue
+
+        # Трилинейная интерполяция расстояния и градиента
+        distance = 0.0
+        gx = gy = gz = 0.0
+        for corner in range(8):
+            ox, oy, oz = (corner >> 2) & 1, (corner >> 1) & 1, corner & 1
+            weight = ((fx if ox else 1.0 - fx) *
+                      (fy if oy else 1.0 - fy) *
+                      (fz if oz else 1.0 - fz))
+            distance += field[x + ox, y + oy, z + oz, 0] * weight
+            gx += field[x + ox, y + oy, z + oz, 1] * weight
+            gy += field[x + ox, y + oy, z + oz, 2] * weight
+            gz += field[x + ox, y + oy, z + oz, 3] * weight
+
+        if abs(distance) > range_of_effect:
+            continue
+        length = math.sqrt(gx * gx + gy * gy + gz * gz)
+        if length == 0.0:
+            continue
+        # Та же экспоненциальная сила, что и в AntiAttractorHandler.calculate_force_magnitude
+        magnitude = math.exp(-distance * distance / range_of_effect) / length
+        velocities[i, 0] += gx * magnitude
+        velocities[i, 1] += gy * magnitude
+        velocities[i, 2] += gz * magnitude
+
+
+def apply_distance_field_force(distance_field, positions, velocities, range_of_effect):
+    """Выборка запечённого поля расстояний и сила отталкивания одним проходом по частицам."""
+    _apply_distance_field_force(distance_field.field, distance_field.bounds_min, distance_field.bounds_max,
+                                positions, velocities, range_of_effect)
+
+
+@numba.njit(nogil=True, cache=True)
+def _primitive_distance(kind, params, x, y, z):
+    """Знаковое расстояние и направление его роста для точки в локальной системе фигуры, как в shapes.sdf."""
+    if kind == sdf.CYLINDER:
+        base_radius, top_radius, height = params[0], params[1], params[2]
+        clamped_y = min(max(y, 0.0), height)
+        side = math.hypot(x, z) - (base_radius + (top_radius - base_radius) * (clamped_y / height))
+        above, below, beside = y > height, y < 0.0, side > 0.0
+        if above:
+            distance = math.hypot(side, y - height) if beside else y - height
+        elif below:
+            distance = math.hypot(side, -y) if beside else -y
+        else:
+            distance = side
+        on_cap = (above or below) and not beside
+        dy = 1.0 if above else (-1.0 if below else 0.0)
+        if on_cap:
+            return distance, 0.0, dy, 0.0
+        return distance, x, dy, z
+    if kind == sdf.BOX:
+        point = (x, y, z)
+        outside = 0.0
+        max_q = -np.inf
+        face = 0
+        direction = [0.0, 0.0, 0.0]
+        for axis in range(3):
+            sign = 1.0 if point[axis] >= 0.0 else -1.0
+            q = abs(point[axis]) - params[axis]
+            if q > max_q:
+                max_q, face = q, axis
+            if q > 0.0:
+                outside += q * q
+                direction[axis] = sign * q
+        outside = math.sqrt(outside)
+        if outside == 0.0:
+            direction[face] = 1.0 if point[face] >= 0.0 else -1.0
+        return outside + min(max_q, 0.0), direction[0], direction[1], direction[2]
+    if kind == sdf.SPHERE:
+        return math.sqrt(x * x + y * y + z * z) - params[0], x, y, z
+    # sdf.CAPSULE
+    offset_y = y - min(max(y, 0.0), params[1])
+    return math.sqrt(x * x + offset_y * offset_y + z * z) - params[0], x, offset_y, z
+
+
+@numba.njit(parallel=True, nogil=True, cache=True)
+def _apply_primitive_forces(kinds, params, origins, rotations, inverse_rotations,
+                            positions, velocities, pair_particles, pair_colliders, group_starts, range_of_effect):
+    # Пары отсортированы по частицам, поток обрабатывает все пары своей частицы, поэтому гонок нет
+    for group in numba.prange(len(group_starts) - 1):
+        for pair in range(group_starts[group], group_starts[group + 1]):
+            i, c = pair_particles[pair], pair_colliders[pair]
+            # Перевод в локальную систему: строка (p - origin) умножается на обратный поворот
+            local = [0.0, 0.0, 0.0]
+            for column in range(3):
+                for row in range(3):
+                    local[column] += (positions[i, row] - origins[c, row]) * inverse_rotations[c, row, column]
+            distance, dx, dy, dz = _primitive_distance(kinds[c], params[c], local[0], local[1], local[2])
+            if abs(distance) > range_of_effect:
+                continue
+            gx = dx * rotations[c, 0, 0] + dy * rotations[c, 1, 0] + dz * rotations[c, 2, 0]
+            gy = dx * rotations[c, 0, 1] + dy * rotations[c, 1, 1] + dz * rotations[c, 2, 1]
+            gz = dx * rotations[c, 0, 2] + dy * rotations[c, 1, 2] + dz * rotations[c, 2, 2]
+            length = math.sqrt(gx * gx + gy * gy + gz * gz)
+            if length == 0.0:
+                continue
+            # Та же экспоненциальная сила, что и в AntiAttractorHandler.calculate_force_magnitude
+            magnitude = math.exp(-distance * distance / range_of_effect) / length
+            velocities[i, 0] += gx * magnitude
+            velocities[i, 1] += gy * magnitude
+            velocities[i, 2] += gz * magnitude
+
+
+def apply_collider_forces(handler, positions, velocities, pair_particles, pair_colliders):
+    """
+    Точная фаза отталкивания для пар-кандидатов широкой фазы. Пары с фигурами, описанными
+    Collider.sdf_primitive, обрабатываются многопоточным ядром, остальные (например, меши с BVH) -
+    ядром NumPy.
+    """
+    primitive = handler.primitive_kinds[pair_colliders] != 0
+    if not primitive.all():
+        numpy_kernels.apply_collider_forces(handler, positions, velocities,
+                                            pair_particles[~primitive], pair_colliders[~primitive])
+        pair_particles, pair_colliders = pair_particles[primitive], pair_colliders[primitive]
+    if len(pair_particles) == 0:
+        return
+    # Границы групп пар одной частицы (пары широкой фазы идут по возрастанию номера частицы)
+    order = np.argsort(pair_particles, kind='stable')
+    pair_particles, pair_colliders = pair_particles[order], pair_colliders[order]
+    group_starts = np.append(np.flatnonzero(np.diff(pair_particles, prepend=-1)), len(pair_particles))
+    _apply_primitive_forces(handler.primitive_kinds, handler.primitive_params, handler.primitive_origins,
+                            handler.primitive_rotations, handler.primitive_inverse_rotations,
+                            positions, velocities, pair_particles, pair_colliders, group_starts,
+                            handler.range_of_effect)
+
+
+def set_threads(threads):
+    """
+    Количество потоков, по которым распределяются циклы по частицам. Значение ограничивается
+    числом потоков, с которым запущена numba (NUMBA_NUM_THREADS, по умолчанию - число ядер).
+    """
+    available = numba.config.NUMBA_NUM_THREADS
+    effective = min(max(int(threads), 1), available)
+    if effective != threads:
+        warnings.warn(f'{threads} numba threads requested, using {effective} (NUMBA_NUM_THREADS={available})')
+    numba.set_num_threads(effective)
+
+
+def get_threads():
+    """Действующее количество потоков ядер."""
+    return numba.get_num_threads()
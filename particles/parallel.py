@@ -0,0 +1,215 @@
+import multiprocessing
+import os
+import traceback
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from particles import kernels
+from particles.particle_buffer import ParticleBuffer
+
+# Массивы, с которыми работают процессы-исполнители
+WORKER_ARRAYS = ('position', 'previous_position', 'velocity', 'age', 'trails')
+
+
+class SharedMemoryAllocator:
+    """
+    Размещает массивы ParticleBuffer в блоках multiprocessing.shared_memory. Запоминает
+    описание каждого блока, чтобы другие процессы могли подключиться к тем же массивам.
+    """
+    def __init__(self):
+        self.blocks = []
+        self.specs = {}  # Имя массива -> (имя блока, форма, тип)
+
+    def __call__(self, name, shape, dtype):
+        dtype = np.dtype(dtype)
+        shape = (shape,) if np.isscalar(shape) else tuple(shape)
+        size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+        block = shared_memory.SharedMemory(create=True, size=size)
+        self.blocks.append(block)
+        self.specs[name] = (block.name, shape, dtype.str)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array.fill(0)
+        return array
+
+    def release(self):
+        """Освобождает блоки. Массивы, размещённые в них, после этого использовать нельзя."""
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks.clear()
+        self.specs.clear()
+
+
+class ParallelUpdater:
+    """
+    Параллельное обновление эмиттеров пулом процессов. Массивы частиц всех эмиттеров лежат
+    в разделяемой памяти, поэтому исполнители пишут результаты прямо в них, а основной
+    процесс читает их для отрисовки без копирования.
+
+    Кадр делится на три части:
+    - эмиссия в основном процессе (генератор случайных чисел у эмиттера один);
+    - интегрирование, запись следов и отталкивание от анти-аттракторов в исполнителях,
+      каждый получает свои диапазоны частиц, большие эмиттеры делятся на несколько диапазонов;
+    - после барьера (ожидания ответа всех исполнителей) основной процесс сдвигает курсор
+      следов и удаляет умершие частицы.
+    Отталкивание применяется и к частицам, умершим в этом кадре: их удаление после барьера
+    даёт тот же результат, что и последовательное обновление.
+    """
+    def __init__(self, workers, min_chunk=4096):
+        """
+        :param workers: Количество процессов-исполнителей.
+        :param min_chunk: Минимальное количество частиц в одном диапазоне.
+        """
+        self.min_chunk = min_chunk
+        self.allocators = {}  # id(emitter) -> SharedMemoryAllocator
+        self._handler_token = None
+        self.connections = []
+        self.processes = []
+        # Общий для всех процессов учёт разделяемой памяти: блоки освобождает только основной процесс
+        if os.name == 'posix':
+            resource_tracker.ensure_running()
+        for _ in range(workers):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker_main, args=(child,), daemon=True)
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def register(self, emitter):
+        """Переносит хранилище эмиттера в разделяемую память и подключает к нему исполнителей."""
+        key = id(emitter)
+        if key in self.allocators:
+            return
+        allocator = SharedMemoryAllocator()
+        buffer = ParticleBuffer(emitter.buffer.capacity, emitter.buffer.trails.length, allocator=allocator)
+        buffer.copy_from(emitter.buffer)
+        emitter.buffer = buffer
+        self.allocators[key] = allocator
+        specs = {name: allocator.specs[name] for name in WORKER_ARRAYS}
+        self._broadcast(('attach', key, specs))
+
+    def update(self, emitters, handler, delta_time, timer_phase):
+        """
+        Один кадр обновления всех эмиттеров.
+        :param timer_phase: Функция phase_name -> контекстный менеджер замера времени.
+        """
+        for emitter in emitters:
+            self.register(emitter)
+
+        with timer_phase('anti_attractor'):
+            handler.update_transforms()
+            token = (handler._collider_versions, id(handler.distance_field))
+            if token != self._handler_token:
+                self._handler_token = token
+                self._broadcast(('handler', handler))
+
+        with timer_phase('emit'):
+            for emitter in emitters:
+                emitter.emit(delta_time)
+
+        # Раздаём диапазоны частиц исполнителям по кругу
+        with timer_phase('integrate'):
+            tasks = [[] for _ in self.connections]
+            index = 0
+            for emitter in emitters:
+                for start, end in self.split(emitter.buffer.count):
+                    tasks[index % len(tasks)].append((id(emitter), start, end, delta_time,
+                                                      tuple(emitter.acceleration), emitter.buffer.trails.cursor))
+                    index += 1
+            for connection, worker_tasks in zip(self.connections, tasks):
+                connection.send(('step', worker_tasks))
+            # Барьер кадра: ждём все исполнители
+            for connection in self.connections:
+                _check_reply(connection.recv())
+
+            for emitter in emitters:
+                trails = emitter.buffer.trails
+                trails.cursor = (trails.cursor + 1) % trails.length
+                emitter.remove_dead()
+
+    def split(self, count):
+        """Делит [0, count) на диапазоны для исполнителей, не мельче min_chunk частиц."""
+        if count == 0:
+            return []
+        chunks = max(1, min(len(self.connections), count // self.min_chunk))
+        bounds = np.linspace(0, count, chunks + 1).astype(int)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def close(self, emitters=()):
+        """
+        Останавливает исполнителей и освобождает разделяемую память. Хранилища эмиттеров
+        копируются обратно в обычную память, чтобы эмиттеры можно было использовать дальше.
+        """
+        self._broadcast(('stop',))
+        for process in self.processes:
+            process.join()
+        for connection in self.connections:
+            connection.close()
+        self.connections.clear()
+        self.processes.clear()
+
+        for emitter in emitters:
+            if id(emitter) in self.allocators:
+                buffer = ParticleBuffer(emitter.buffer.capacity, emitter.buffer.trails.length)
+                buffer.copy_from(emitter.buffer)
+                emitter.buffer = buffer
+        for allocator in self.allocators.values():
+            allocator.release()
+        self.allocators.clear()
+
+    def _broadcast(self, message):
+        for connection in self.connections:
+            connection.send(message)
+        for connection in self.connections:
+            _check_reply(connection.recv())
+
+
+def _check_reply(reply):
+    if reply != 'ok':
+        raise RuntimeError(f'particle worker failed:\n{reply}')
+
+
+def _worker_main(connection):
+    """Цикл процесса-исполнителя: подключение к разделяемой памяти и обработка диапазонов частиц."""
+    blocks = []
+    buffers = {}  # id эмиттера -> {имя массива: массив}
+    handler = None
+    while True:
+        message = connection.recv()
+        kind = message[0]
+        try:
+            if kind == 'attach':
+                _, key, specs = message
+                arrays = {}
+                for name, (block_name, shape, dtype) in specs.items():
+                    block = shared_memory.SharedMemory(name=block_name)
+                    blocks.append(block)
+                    arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+                buffers[key] = arrays
+            elif kind == 'handler':
+                handler = message[1]
+            elif kind == 'step':
+                for key, start, end, delta_time, acceleration, cursor in message[1]:
+                    _step(buffers[key], start, end, delta_time, acceleration, cursor, handler)
+            elif kind == 'stop':
+                buffers.clear()
+                for block in blocks:
+                    block.close()
+                connection.send('ok')
+                break
+            connection.send('ok')
+        except Exception:
+            connection.send(traceback.format_exc())
+
+
+def _step(arrays, start, end, delta_time, acceleration, cursor, handler):
+    """Обновление диапазона частиц [start, end) одного эмиттера, как в Emitter.update."""
+    position = arrays['position'][start:end]
+    velocity = arrays['velocity'][start:end]
+    arrays['previous_position'][start:end] = position
+    kernels.integrate(position, velocity, arrays['age'][start:end], acceleration, delta_time)
+    arrays['trails'][start:end, cursor] = position
+    if handler is not None:
+        handler.apply_anti_attraction_batch(position, velocity)
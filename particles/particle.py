@@ -1,5 +1,4 @@
 import glm
-from OpenGL.GL import *
 
 from particles.trail import Trail
 
@@ -21,8 +20,9 @@ class Particle:
         self.trail = Trail(self.position, 16) if self.has_trail else None
 
     def update(self, delta_time, acceleration):
-        self.position += self.velocity * delta_time + glm.vec3(*acceleration) * (delta_time ** 2) / 2
-        self.velocity += glm.vec3(*acceleration) * delta_time
+        acceleration = glm.vec3(*acceleration)
+        self.position += self.velocity * delta_time + acceleration * (delta_time ** 2) / 2
+        self.velocity += acceleration * delta_time
         self.age += delta_time
         if self.has_trail:
             self.trail.update(self.position)
@@ -52,17 +52,3 @@ class Particle:
             ]
         else:
             return [self.color.x, self.color.y, self.color.z]
-
-
-    def render(self, shader):
-        # Устанавливаем цвет частицы с текущей прозрачностью
-        shader.set_vec4('particleColor', glm.vec4(*self.get_color(), self.get_transparency()))
-        # Устанавливаем размер точки
-        glPointSize(self.size)
-        # Рендерим частицу как точку
-        glBegin(GL_POINTS)
-        glVertex3f(self.position.x, self.position.y, self.position.z)
-        glEnd()
-        # Рендерим след, если он есть
-        if self.has_trail:
-            self.trail.render(shader)
@@ -0,0 +1,388 @@
+import glm
+import numpy as np
+
+from particles.particle import Particle
+from particles.trail import TrailBuffer
+
+
+class ParticleBuffer:
+    """
+    Хранилище частиц эмиттера в виде непрерывных массивов NumPy (structure of arrays).
+    Частицы с индексами [0, count) считаются живыми, остальная часть массивов - свободный запас.
+    """
+    # Битовые флаги частицы
+    FLAG_COLOR_FADING = 1
+    FLAG_TRAIL = 2
+    # Частица летит свободно: её траектория задаётся точкой привязки, см. anchor
+    FLAG_FREE = 4
+    # Частица уже прошла отталкивание в подшагах этого шага, см. ParticleSystem.substep
+    FLAG_SUBSTEPPED = 8
+    # Массивы атрибутов частиц (без следов)
+    ARRAYS = ('position', 'previous_position', 'velocity', 'start_position', 'color', 'size', 'age', 'lifetime',
+              'transparency_radius', 'flags', 'anchor_position', 'anchor_velocity', 'anchor_age', 'free_until')
+
+    def __init__(self, capacity, trail_length=16, allocator=None):
+        """
+        :param capacity: Максимальное количество частиц в хранилище.
+        :param trail_length: Количество точек в следе каждой частицы.
+        :param allocator: Функция (имя, форма, тип) -> заполненный нулями массив. По умолчанию np.zeros;
+                          позволяет разместить массивы, например, в разделяемой памяти.
+        """
+        allocate = allocator if allocator is not None else _zeros
+        self.capacity = capacity
+        self.count = 0
+
+        self.position = allocate('position', (capacity, 3), np.float32)
+        # Позиция до последнего шага симуляции, для интерполяции при отрисовке
+        self.previous_position = allocate('previous_position', (capacity, 3), np.float32)
+        self.velocity = allocate('velocity', (capacity, 3), np.float32)
+        self.start_position = allocate('start_position', (capacity, 3), np.float32)
+        # Нормализованный цвет RGBA
+        self.color = allocate('color', (capacity, 4), np.float32)
+        self.size = allocate('size', capacity, np.float32)
+        # Возраст и время жизни в double, чтобы накопление возраста не расходилось с float Python
+        self.age = allocate('age', capacity, np.float64)
+        self.lifetime = allocate('lifetime', capacity, np.float64)
+        # NaN означает, что радиус прозрачности не задан
+        self.transparency_radius = allocate('transparency_radius', capacity, np.float32)
+        self.transparency_radius[:] = np.nan
+        self.flags = allocate('flags', capacity, np.uint8)
+        # Состояние свободно летящих частиц в момент привязки и возраст, до которого полёт заведомо свободен
+        self.anchor_position = allocate('anchor_position', (capacity, 3), np.float32)
+        self.anchor_velocity = allocate('anchor_velocity', (capacity, 3), np.float32)
+        self.anchor_age = allocate('anchor_age', capacity, np.float64)
+        self.free_until = allocate('free_until', capacity, np.float64)
+        # Следы хранятся для всех частиц, отрисовываются только у частиц с флагом FLAG_TRAIL
+        self.trails = TrailBuffer(capacity, trail_length, allocator=allocator)
+        # Рабочая маска для проверки времени жизни, чтобы не выделять её каждый кадр
+        self._dead = np.zeros(capacity, dtype=bool)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield ParticleView(self, index)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('particle index out of range')
+        return ParticleView(self, index)
+
+    def is_full(self):
+        return self.count >= self.capacity
+
+    def append(self, particle: Particle):
+        """Копирует состояние объекта частицы в первый свободный слот хранилища."""
+        if self.is_full():
+            raise OverflowError('particle buffer is full')
+        index = self.count
+        self.position[index] = particle.position
+        self.previous_position[index] = particle.position
+        self.velocity[index] = particle.velocity
+        self.start_position[index] = particle.start_position
+        self.color[index] = particle.color
+        self.size[index] = particle.size
+        self.age[index] = particle.age
+        self.lifetime[index] = particle.lifetime
+        self.transparency_radius[index] = np.nan if particle.transparency_radius is None \
+            else particle.transparency_radius
+        flags = 0
+        if particle.color_fading:
+            flags |= self.FLAG_COLOR_FADING
+        if particle.has_trail:
+            flags |= self.FLAG_TRAIL
+        self.flags[index] = flags
+        if particle.trail is not None:
+            self.trails.reset(index, particle.trail.positions)
+        else:
+            self.trails.reset(index, particle.position)
+        self.count += 1
+
+    def allocate(self, count):
+        """
+        Занимает до count свободных слотов подряд и возвращает их срез. Содержимое слотов
+        не инициализируется, его заполняет вызывающий код.
+        """
+        count = min(count, self.capacity - self.count)
+        slots = slice(self.count, self.count + count)
+        self.count += count
+        return slots
+
+    def _arrays(self):
+        """Все массивы с данными частиц, включая следы."""
+        return [getattr(self, name) for name in self.ARRAYS] + [self.trails.positions]
+
+    def keep(self, mask):
+        """Оставляет только частицы, отмеченные в маске, сохраняя их порядок."""
+        mask = np.asarray(mask, dtype=bool)
+        kept = int(np.count_nonzero(mask))
+        if kept == self.count:
+            return
+        for array in self._arrays():
+            array[:kept] = array[:self.count][mask]
+        self.count = kept
+
+    def swap_remove(self, indices):
+        """
+        Удаляет частицы с номерами indices (без повторов), перенося на их место последние живые
+        частицы. Порядок оставшихся частиц не сохраняется, зато переносятся только частицы из хвоста.
+        """
+        indices = np.asarray(indices)
+        if len(indices) == 0:
+            return
+        new_count = self.count - len(indices)
+        removed = np.zeros(self.count - new_count, dtype=bool)
+        tail = indices[indices >= new_count] - new_count
+        removed[tail] = True
+        # Дыры в начале хранилища заполняются живыми частицами из хвоста
+        holes = indices[indices < new_count]
+        sources = new_count + np.flatnonzero(~removed)
+        if len(holes):
+            for array in self._arrays():
+                array[holes] = array[sources]
+        self.count = new_count
+
+    def remove_dead(self):
+        """Векторная проверка времени жизни и удаление умерших частиц перестановкой из хвоста."""
+        dead = self._dead[:self.count]
+        np.greater_equal(self.age[:self.count], self.lifetime[:self.count], out=dead)
+        if dead.any():
+            self.swap_remove(np.flatnonzero(dead))
+
+    def free_mask(self):
+        """Маска свободно летящих частиц среди живых."""
+        return (self.flags[:self.count] & self.FLAG_FREE) != 0
+
+    def anchor(self, indices, free_until):
+        """
+        Переводит частицы в режим свободного полёта: запоминает их текущее состояние как точку
+        привязки, дальше положение вычисляется по формуле p0 + v0·t + a·t²/2 без пошагового интегрирования.
+        """
+        self.anchor_position[indices] = self.position[indices]
+        self.anchor_velocity[indices] = self.velocity[indices]
+        self.anchor_age[indices] = self.age[indices]
+        self.free_until[indices] = free_until
+        self.flags[indices] |= self.FLAG_FREE
+
+    def evaluate(self, acceleration, index, age=None):
+        """
+        Положения и скорости частиц index (срез или массив номеров) в возрасте age (по умолчанию -
+        текущем), вычисленные по точке привязки. Имеют смысл только для свободно летящих частиц.
+        """
+        age = self.age[index] if age is None else age
+        t = (age - self.anchor_age[index]).astype(np.float32)[:, None]
+        acceleration = np.asarray(acceleration, dtype=np.float32)
+        velocity = self.anchor_velocity[index] + acceleration * t
+        position = self.anchor_velocity[index] + velocity
+        position *= t / 2
+        position += self.anchor_position[index]
+        return position, velocity
+
+    def materialize(self, acceleration, delta_time, mask=None, positions_only=False):
+        """
+        Записывает в position, previous_position и velocity вычисленное состояние свободно летящих
+        частиц из маски mask (по умолчанию - всех свободных). При positions_only записываются только позиции.
+        """
+        if mask is None:
+            mask = self.free_mask()
+        selected = int(np.count_nonzero(mask))
+        if selected == 0:
+            return
+        # Немногие частицы выгоднее выбрать по номерам, большинство - вычислить сплошным проходом
+        # по всем живым частицам и записать по маске
+        if selected * 4 < self.count:
+            index = np.flatnonzero(mask)
+            mask = np.ones(selected, dtype=bool)
+        else:
+            index = slice(0, self.count)
+
+        position, velocity = self.evaluate(acceleration, index)
+        _write(self.position, index, position, mask)
+        if positions_only:
+            return
+        _write(self.velocity, index, velocity, mask)
+        # Предыдущая позиция частиц, привязанных на последнем шаге, уже записана интегрированием
+        age = self.age[index] - delta_time
+        anchor_age = self.anchor_age[index]
+        stepped = mask & (age > anchor_age - delta_time / 2)
+        previous_position, _ = self.evaluate(acceleration, index, np.maximum(age, anchor_age))
+        _write(self.previous_position, index, previous_position, stepped)
+
+    def release(self, mask, acceleration, delta_time):
+        """Возвращает свободно летящие частицы из маски к пошаговому интегрированию, вычислив их состояние."""
+        self.materialize(acceleration, delta_time, mask)
+        self.flags[:self.count][mask] &= ~self.FLAG_FREE & 0xFF
+
+    def interpolate_positions(self, alpha, out=None):
+        """Позиции живых частиц между двумя последними шагами симуляции: alpha=0 - предыдущий, 1 - текущий."""
+        count = self.count
+        if out is None:
+            out = np.empty((count, 3), dtype=np.float32)
+        np.subtract(self.position[:count], self.previous_position[:count], out=out)
+        out *= alpha
+        out += self.previous_position[:count]
+        return out
+
+    def compute_colors(self, out=None):
+        """
+        Векторный вариант Particle.get_color и Particle.get_transparency для всех живых частиц.
+        Возвращает массив RGBA формы (count, 4).
+        """
+        count = self.count
+        if out is None:
+            out = np.empty((count, 4), dtype=np.float32)
+        age = self.age[:count]
+        lifetime = self.lifetime[:count]
+        life_left = 1.0 - age / lifetime
+
+        # Цвет затухает со временем жизни, если указан соответствующий флаг
+        out[:, :3] = self.color[:count, :3]
+        fading = (self.flags[:count] & self.FLAG_COLOR_FADING) != 0
+        out[fading, :3] *= life_left[fading, None]
+
+        # Прозрачность по возрасту либо по удалению от точки рождения
+        radius = self.transparency_radius[:count]
+        distance = np.linalg.norm(self.start_position[:count] - self.position[:count], axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            by_distance = np.where(radius != 0.0, 1.0 - distance / radius, 0.0)
+        out[:, 3] = np.maximum(0.0, np.where(np.isnan(radius), life_left, by_distance))
+        return out
+
+    def copy_from(self, other: 'ParticleBuffer'):
+        """Копирует живые частицы и состояние следов из другого хранилища той же вместимости."""
+        count = other.count
+        for name in self.ARRAYS:
+            getattr(self, name)[:count] = getattr(other, name)[:count]
+        self.trails.positions[:count] = other.trails.positions[:count]
+        self.trails.cursor = other.trails.cursor
+        self.count = count
+
+    def clear(self):
+        self.count = 0
+
+
+def _write(array, index, values, mask):
+    """Записывает в array[index] строки values, отмеченные в маске."""
+    if isinstance(index, slice):
+        np.copyto(array[index], values, where=mask[:, None])
+    else:
+        array[index[mask]] = values[mask]
+
+
+def _zeros(name, shape, dtype):
+    return np.zeros(shape, dtype=dtype)
+
+
+class ParticleView(Particle):
+    """
+    Представление одной частицы из ParticleBuffer с интерфейсом Particle.
+    Чтение и запись атрибутов идут напрямую в массивы хранилища.
+    След обновляется эмиттером для всех частиц сразу, поэтому trail возвращает его копию.
+    """
+    def __init__(self, buffer: ParticleBuffer, index):
+        self._buffer = buffer
+        self._index = index
+
+    def update(self, delta_time, acceleration):
+        acceleration = glm.vec3(*acceleration)
+        self.position += self.velocity * delta_time + acceleration * (delta_time ** 2) / 2
+        self.velocity += acceleration * delta_time
+        self.age += delta_time
+
+    @property
+    def position(self):
+        return glm.vec3(*self._buffer.position[self._index])
+
+    @position.setter
+    def position(self, value):
+        self._buffer.position[self._index] = value
+
+    @property
+    def velocity(self):
+        return glm.vec3(*self._buffer.velocity[self._index])
+
+    @velocity.setter
+    def velocity(self, value):
+        self._buffer.velocity[self._index] = value
+
+    @property
+    def start_position(self):
+        return glm.vec3(*self._buffer.start_position[self._index])
+
+    @start_position.setter
+    def start_position(self, value):
+        self._buffer.start_position[self._index] = value
+
+    @property
+    def color(self):
+        return glm.vec4(*self._buffer.color[self._index])
+
+    @color.setter
+    def color(self, value):
+        self._buffer.color[self._index] = value
+
+    @property
+    def size(self):
+        return float(self._buffer.size[self._index])
+
+    @size.setter
+    def size(self, value):
+        self._buffer.size[self._index] = value
+
+    @property
+    def age(self):
+        return float(self._buffer.age[self._index])
+
+    @age.setter
+    def age(self, value):
+        self._buffer.age[self._index] = value
+
+    @property
+    def lifetime(self):
+        return float(self._buffer.lifetime[self._index])
+
+    @lifetime.setter
+    def lifetime(self, value):
+        self._buffer.lifetime[self._index] = value
+
+    @property
+    def transparency_radius(self):
+        radius = float(self._buffer.transparency_radius[self._index])
+        return None if np.isnan(radius) else radius
+
+    @transparency_radius.setter
+    def transparency_radius(self, value):
+        self._buffer.transparency_radius[self._index] = np.nan if value is None else value
+
+    @property
+    def color_fading(self):
+        return bool(self._buffer.flags[self._index] & ParticleBuffer.FLAG_COLOR_FADING)
+
+    @color_fading.setter
+    def color_fading(self, value):
+        self._set_flag(ParticleBuffer.FLAG_COLOR_FADING, value)
+
+    @property
+    def has_trail(self):
+        return bool(self._buffer.flags[self._index] & ParticleBuffer.FLAG_TRAIL)
+
+    @has_trail.setter
+    def has_trail(self, value):
+        self._set_flag(ParticleBuffer.FLAG_TRAIL, value)
+
+    @property
+    def trail(self):
+        return self._buffer.trails.get_trail(self._index) if self.has_trail else None
+
+    @trail.setter
+    def trail(self, value):
+        self._buffer.trails.reset(self._index, self.position if value is None else value.positions)
+
+    def _set_flag(self, flag, value):
+        if value:
+            self._buffer.flags[self._index] |= flag
+        else:
+            self._buffer.flags[self._index] &= ~flag & 0xFF
@@ -0,0 +1,127 @@
+import numpy as np
+from OpenGL.GL import *
+
+from particles.particle_buffer import ParticleBuffer
+
+
+class ParticleRenderer:
+    """
+    Отрисовка частиц через потоковые VBO: данные всех частиц эмиттера записываются
+    в переиспользуемый буфер и выводятся одним вызовом glDrawArrays(GL_POINTS),
+    а все следы эмиттера - одним вызовом glDrawElements(GL_LINE_STRIP) с перезапуском примитива.
+    """
+    # Позиция (3), цвет RGBA (4), размер (1)
+    VERTEX_SIZE = 8
+    # Индекс перезапуска ломаной между следами разных частиц
+    RESTART_INDEX = 0xFFFFFFFF
+
+    def __init__(self):
+        self.capacity = 0
+        self.vertices = np.zeros((0, self.VERTEX_SIZE), dtype=np.float32)
+        self.trail_capacity = 0
+        self.trail_vertices = np.zeros((0, self.VERTEX_SIZE), dtype=np.float32)
+
+        self.VAO, self.VBO = self._create_vertex_array()
+        self.trail_VAO, self.trail_VBO = self._create_vertex_array()
+        self.trail_EBO = glGenBuffers(1)
+
+    def _create_vertex_array(self):
+        vao = glGenVertexArrays(1)
+        vbo = glGenBuffers(1)
+
+        glBindVertexArray(vao)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+
+        stride = self.VERTEX_SIZE * self.vertices.itemsize
+        # Позиции
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
+        # Цвет
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(1, 4, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(3 * self.vertices.itemsize))
+        # Размер точки
+        glEnableVertexAttribArray(2)
+        glVertexAttribPointer(2, 1, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(7 * self.vertices.itemsize))
+
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindVertexArray(0)
+        return vao, vbo
+
+    def reserve(self, count):
+        """Увеличивает промежуточный массив и VBO так, чтобы вместить count частиц."""
+        if count <= self.capacity:
+            return
+        self.capacity = max(count, 2 * self.capacity)
+        self.vertices = np.zeros((self.capacity, self.VERTEX_SIZE), dtype=np.float32)
+
+    def reserve_trails(self, count):
+        """Увеличивает промежуточный массив следов так, чтобы вместить count вершин."""
+        if count <= self.trail_capacity:
+            return
+        self.trail_capacity = max(count, 2 * self.trail_capacity)
+        self.trail_vertices = np.zeros((self.trail_capacity, self.VERTEX_SIZE), dtype=np.float32)
+
+    def draw(self, buffer: ParticleBuffer, alpha=1.0):
+        """
+        Отрисовка всех живых частиц хранилища одним вызовом.
+
+        :param alpha: Доля шага для интерполяции позиций между двумя последними шагами симуляции.
+        """
+        count = buffer.count
+        if count == 0:
+            return
+        self.reserve(count)
+
+        vertices = self.vertices[:count]
+        buffer.interpolate_positions(alpha, out=vertices[:, 0:3])
+        buffer.compute_colors(out=vertices[:, 3:7])
+        vertices[:, 7] = buffer.size[:count]
+
+        self._stream(GL_ARRAY_BUFFER, self.VBO, self.vertices.nbytes, vertices)
+
+        # Размер точки задаётся в вершинном шейдере
+        glEnable(GL_PROGRAM_POINT_SIZE)
+        glBindVertexArray(self.VAO)
+        glDrawArrays(GL_POINTS, 0, count)
+        glBindVertexArray(0)
+
+        self.draw_trails(buffer, vertices[:, 3:7])
+
+    def draw_trails(self, buffer: ParticleBuffer, colors):
+        """Отрисовка следов всех частиц с флагом FLAG_TRAIL одним вызовом, цветом самих частиц."""
+        trail_indices = np.flatnonzero(buffer.flags[:buffer.count] & ParticleBuffer.FLAG_TRAIL)
+        trail_count = len(trail_indices)
+        if trail_count == 0:
+            return
+        trails = buffer.trails
+        vertex_count = trail_count * trails.length
+        self.reserve_trails(vertex_count)
+
+        # Кольцевой буфер копируется как есть, порядок точек задаётся индексами
+        vertices = self.trail_vertices[:vertex_count].reshape(trail_count, trails.length, self.VERTEX_SIZE)
+        vertices[:, :, 0:3] = trails.positions[trail_indices]
+        vertices[:, :, 3:7] = colors[trail_indices, None, :]
+
+        indices = np.empty((trail_count, trails.length + 1), dtype=np.uint32)
+        indices[:, :-1] = np.arange(trail_count, dtype=np.uint32)[:, None] * trails.length + trails.order()
+        indices[:, -1] = self.RESTART_INDEX
+
+        self._stream(GL_ARRAY_BUFFER, self.trail_VBO, self.trail_vertices.nbytes, vertices)
+        glBindVertexArray(self.trail_VAO)
+        self._stream(GL_ELEMENT_ARRAY_BUFFER, self.trail_EBO, indices.nbytes, indices)
+
+        glEnable(GL_PRIMITIVE_RESTART)
+        glPrimitiveRestartIndex(self.RESTART_INDEX)
+        glDrawElements(GL_LINE_STRIP, indices.size, GL_UNSIGNED_INT, None)
+        glDisable(GL_PRIMITIVE_RESTART)
+        glBindVertexArray(0)
+
+    @staticmethod
+    def _stream(target, buffer_id, capacity_bytes, data):
+        """Записывает данные в буфер, предварительно «осиротив» его хранилище."""
+        glBindBuffer(target, buffer_id)
+        # Осиротение буфера: драйвер выделяет новую память, не дожидаясь окончания предыдущей отрисовки
+        glBufferData(target, capacity_bytes, None, GL_STREAM_DRAW)
+        glBufferSubData(target, 0, data.nbytes, data)
+        if target == GL_ARRAY_BUFFER:
+            glBindBuffer(target, 0)
@@ -1,27 +1,204 @@
-from typing import List
+from contextlib import nullcontext
+from typing import List, Optional
 
-from materials.shader import Shader
+import numpy as np
+
+from particles import kernels
 from particles.anti_attractor import AntiAttractorHandler
 from particles.emitter import Emitter
+from particles.parallel import ParallelUpdater
+from particles.profiling import PhaseTimer
 
 
 class ParticleSystem:
-    def __init__(self, anti_attractor_handler: AntiAttractorHandler, acceleration=None):
+    def __init__(self, anti_attractor_handler: AntiAttractorHandler, acceleration=None, workers=0,
+                 backend='numpy', threads=None, lazy_trajectories=False, min_free_steps=2,
+                 max_particle_substeps=8, substep_fraction=0.5):
+        """
+        :param workers: Количество процессов для параллельного обновления эмиттеров; 0 - обновление
+                        в текущем процессе. В параллельном режиме систему нужно закрыть методом close.
+        :param backend: Ядра симуляции: 'numpy' или 'numba' (многопоточные, без GIL). Без установленной
+                        numba используются ядра NumPy.
+        :param threads: Количество потоков ядер numba (по умолчанию - все ядра процессора).
+        :param lazy_trajectories: Частицы вне зон действия всех коллайдеров летят по параболе и не
+                                  интегрируются пошагово: хранится только их состояние в момент привязки,
+                                  а позиции вычисляются по формуле, когда нужны для следов или отрисовки.
+                                  В параллельном режиме не используется.
+        :param min_free_steps: Частица переводится в свободный полёт, только если он заведомо продлится
+                               дольше такого количества шагов.
+        :param max_particle_substeps: Наибольшее количество подшагов для одной частицы; 1 отключает подшаги.
+        :param substep_fraction: Частица, смещение которой за шаг больше такой доли расстояния до
+                                 ближайшего коллайдера, делит шаг на подшаги, чтобы не проскочить
+                                 зону действия силы. Шаг остальных частиц не меняется.
+                                 В параллельном режиме подшаги не используются.
+        """
         if acceleration is None:
             acceleration = [0.0, -9.81, 0.0]
         self.emitters: List[Emitter] = []
         self.anti_attractor_handler = anti_attractor_handler
         self.acceleration = acceleration  # Общие ускорения, например, гравитация
+        # Отрисовщик с ресурсами OpenGL. Симуляция от него не зависит и может работать без дисплея
+        self.renderer = None
+        self.timer: Optional[PhaseTimer] = None  # Замер времени фаз обновления, если задан
+        self.parallel = ParallelUpdater(workers) if workers > 0 else None
+        self.lazy_trajectories = lazy_trajectories
+        self.min_free_steps = min_free_steps
+        self._handler_generation = None
+        self.max_particle_substeps = max_particle_substeps
+        self.substep_fraction = substep_fraction
+        self.kernels = kernels
+        self.set_backend(backend, threads)
 
     def add_emitter(self, emitter: Emitter):
+        emitter.kernels = self.kernels
         self.emitters.append(emitter)
 
+    def set_backend(self, backend, threads=None):
+        """Переключает ядра симуляции всех эмиттеров и анти-аттракторов, см. kernels.get_backend."""
+        self.kernels = kernels.get_backend(backend)
+        if threads is not None:
+            self.kernels.set_threads(threads)
+        self.anti_attractor_handler.kernels = self.kernels
+        for emitter in self.emitters:
+            emitter.kernels = self.kernels
+
     def update(self, delta_time):
+        if self.parallel is not None:
+            self.parallel.update(self.emitters, self.anti_attractor_handler, delta_time, self._phase)
+            return
+
+        with self._phase('anti_attractor'):
+            self.anti_attractor_handler.update_transforms()
+            if self.lazy_trajectories and self._handler_generation != self.anti_attractor_handler.generation:
+                # Коллайдеры изменились: время свободного полёта частиц нужно пересчитать
+                self._handler_generation = self.anti_attractor_handler.generation
+                for emitter in self.emitters:
+                    emitter.buffer.release(emitter.buffer.free_mask(), emitter.acceleration, emitter.last_delta_time)
         for emitter in self.emitters:
-            emitter.update(delta_time)
-            for particle in emitter.particles:
-                self.anti_attractor_handler.apply_anti_attraction(particle)
+            with self._phase('emit'):
+                emitter.emit(delta_time)
+            # Подшаги нужны только из-за коллайдеров и учитываются в их фазе
+            with self._phase('anti_attractor'):
+                substeps = self.plan_substeps(emitter, delta_time)
+            with self._phase('integrate'):
+                emitter.integrate(delta_time)
+            with self._phase('anti_attractor'):
+                self.substep(emitter, delta_time, *substeps)
+            with self._phase('trail'):
+                emitter.update_trails()
+            with self._phase('integrate'):
+                emitter.remove_dead()
+            with self._phase('anti_attractor'):
+                self.apply_anti_attraction(emitter, delta_time)
+
+    def plan_substeps(self, emitter: Emitter, delta_time):
+        """
+        Выбирает пошагово интегрируемые частицы, которые за шаг сместятся больше чем на долю
+        substep_fraction расстояния до ближайшего коллайдера, и количество подшагов для каждой.
+        Возвращает номера частиц, их количества подшагов (больше 1) и их состояние до шага.
+        """
+        buffer = emitter.buffer
+        if self.max_particle_substeps <= 1 or not self.anti_attractor_handler.colliders:
+            return None, None, None
+        free = buffer.free_mask()
+        if free.any():
+            indices = np.flatnonzero(~free)
+            positions, velocities = buffer.position[indices], buffer.velocity[indices]
+        else:
+            indices = None
+            positions, velocities = buffer.position[:buffer.count], buffer.velocity[:buffer.count]
+
+        # Оценка смещения сверху, по нему же ограничивается область точного вычисления расстояний
+        speed = np.sqrt(np.einsum('ij,ij->i', velocities, velocities))
+        displacement = speed * delta_time + float(np.linalg.norm(emitter.acceleration)) * delta_time ** 2 / 2
+        reach = displacement / self.substep_fraction
+        clearance = self.anti_attractor_handler.clearance(positions, reach)
+        selected = clearance < reach
+        if not selected.any():
+            return None, None, None
+
+        with np.errstate(divide='ignore'):
+            counts = np.ceil(reach[selected] / clearance[selected])
+        counts = np.minimum(counts, self.max_particle_substeps).astype(np.int64)
+        selected = np.flatnonzero(selected)
+        return (selected if indices is None else indices[selected]), counts, \
+            (positions[selected], velocities[selected])
+
+    def substep(self, emitter: Emitter, delta_time, indices, counts, state):
+        """
+        Пересчитывает шаг частиц indices из состояния до шага за counts подшагов длиной
+        delta_time / counts. После каждого подшага применяется отталкивание, уменьшенное в counts раз,
+        чтобы суммарный импульс за шаг не зависел от количества подшагов. На каждом проходе векторно
+        обрабатываются все частицы, которым ещё остались подшаги. Возраст и предыдущие позиции
+        уже обновлены интегрированием.
+        """
+        if indices is None:
+            return
+        buffer = emitter.buffer
+        positions, velocities = state
+        step = (delta_time / counts).astype(np.float32)[:, None]
+        acceleration = np.asarray(emitter.acceleration, dtype=np.float32)
+        for substep in range(int(counts.max())):
+            active = np.flatnonzero(counts > substep)
+            position, velocity, h = positions[active], velocities[active], step[active]
+            position += velocity * h + acceleration * (h * h / 2)
+            velocity += acceleration * h
+            impulse = velocity.copy()
+            self.anti_attractor_handler.apply_anti_attraction_batch(position, impulse)
+            impulse -= velocity
+            impulse /= counts[active, None]
+            velocity += impulse
+            positions[active], velocities[active] = position, velocity
+        buffer.position[indices] = positions
+        buffer.velocity[indices] = velocities
+        buffer.flags[indices] |= buffer.FLAG_SUBSTEPPED
+
+    def apply_anti_attraction(self, emitter: Emitter, delta_time):
+        """
+        Отталкивание частиц эмиттера в конце шага. Свободно летящие частицы пропускаются, а частицы,
+        уже получившие отталкивание в подшагах, сохраняют свои скорости. В режиме lazy_trajectories
+        частицы, которые заведомо долго не попадут в зону действия коллайдеров, переводятся в свободный полёт.
+        """
+        buffer = emitter.buffer
+        count = buffer.count
+        handler = self.anti_attractor_handler
+        substepped = np.flatnonzero(buffer.flags[:count] & buffer.FLAG_SUBSTEPPED)
+        buffer.flags[substepped] &= ~buffer.FLAG_SUBSTEPPED & 0xFF
+        substepped_velocities = buffer.velocity[substepped]
+        if not self.lazy_trajectories:
+            handler.apply_anti_attraction_batch(buffer.position[:count], buffer.velocity[:count])
+            buffer.velocity[substepped] = substepped_velocities
+            return
+
+        bound = np.flatnonzero(~buffer.free_mask())
+        if len(bound) == 0:
+            return
+        positions, velocities = buffer.position[bound], buffer.velocity[bound]
+        handler.apply_anti_attraction_batch(positions, velocities)
+        buffer.velocity[bound] = velocities
+        buffer.velocity[substepped] = substepped_velocities
+
+        safe_time = handler.safe_time(positions, buffer.velocity[bound], emitter.acceleration)
+        free = safe_time > self.min_free_steps * delta_time
+        if free.any():
+            buffer.anchor(bound[free], buffer.age[bound[free]] + safe_time[free])
+
+    def close(self):
+        """Останавливает процессы параллельного обновления и освобождает разделяемую память."""
+        if self.parallel is not None:
+            self.parallel.close(self.emitters)
+            self.parallel = None
+
+    def _phase(self, name):
+        return self.timer.measure(name) if self.timer is not None else nullcontext()
+
+    def attach_renderer(self, renderer):
+        """Подключает отрисовщик частиц, например ParticleRenderer, созданный в контексте OpenGL."""
+        self.renderer = renderer
 
-    def render(self, shader: Shader):
+    def render(self, alpha=1.0):
+        """:param alpha: Доля шага между двумя последними состояниями симуляции для интерполяции."""
+        if self.renderer is None:
+            return
         for emitter in self.emitters:
-            emitter.render(shader)
+            emitter.render(self.renderer, alpha)
@@ -0,0 +1,60 @@
+import gc
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class PhaseTimer:
+    """Накопитель времени, затраченного на отдельные фазы обновления системы частиц."""
+    def __init__(self):
+        self.totals = defaultdict(float)  # Суммарное время фазы в секундах
+        self.calls = defaultdict(int)
+
+    @contextmanager
+    def measure(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[phase] += time.perf_counter() - start
+            self.calls[phase] += 1
+
+    def reset(self):
+        self.totals.clear()
+        self.calls.clear()
+
+
+class GCMonitor:
+    """Счётчик сборок мусора и их пауз через gc.callbacks, пока монитор запущен."""
+    def __init__(self):
+        self.collections = [0, 0, 0]  # Количество сборок по поколениям
+        self.collected = 0  # Количество собранных объектов
+        self.pause_total = 0.0  # Суммарная пауза в секундах
+        self.pause_max = 0.0
+        self._start = None
+
+    def _callback(self, phase, info):
+        if phase == 'start':
+            self._start = time.perf_counter()
+        elif self._start is not None:
+            pause = time.perf_counter() - self._start
+            self._start = None
+            self.collections[info['generation']] += 1
+            self.collected += info['collected']
+            self.pause_total += pause
+            self.pause_max = max(self.pause_max, pause)
+
+    def start(self):
+        if self._callback not in gc.callbacks:
+            gc.callbacks.append(self._callback)
+
+    def stop(self):
+        if self._callback in gc.callbacks:
+            gc.callbacks.remove(self._callback)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
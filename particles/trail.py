@@ -1,7 +1,5 @@
 import glm
-from OpenGL.GL import *
-
-from materials.shader import Shader
+import numpy as np
 
 
 class Trail:
@@ -13,8 +11,40 @@ class Trail:
         self.positions.pop(0)
         self.positions.append(glm.vec3(*new_position))
 
-    def render(self, shader: Shader):
-        glBegin(GL_LINE_STRIP)
-        for pos in self.positions:
-            glVertex3f(pos.x, pos.y, pos.z)
-        glEnd()
+
+class TrailBuffer:
+    """
+    Следы всех частиц эмиттера в одном кольцевом буфере формы (частицы × длина следа × 3).
+    Все следы сдвигаются одновременно, поэтому курсор записи общий: он указывает на самую
+    старую точку, которая будет перезаписана следующей.
+    """
+    def __init__(self, capacity, length=16, allocator=None):
+        """:param allocator: Функция размещения массива, см. ParticleBuffer."""
+        self.length = length
+        shape = (capacity, length, 3)
+        self.positions = allocator('trails', shape, np.float32) if allocator is not None \
+            else np.zeros(shape, dtype=np.float32)
+        self.cursor = 0
+
+    def order(self):
+        """Номера слотов кольцевого буфера от самой старой точки к самой новой."""
+        return (self.cursor + np.arange(self.length)) % self.length
+
+    def reset(self, index, positions):
+        """Задаёт след частицы списком точек от старой к новой (или одной точкой для всех слотов)."""
+        positions = np.asarray(positions, dtype=np.float32)
+        if positions.ndim == 1:
+            self.positions[index] = positions
+        else:
+            self.positions[index, self.order()] = positions[-self.length:]
+
+    def push(self, positions):
+        """Добавляет новые позиции в следы первых len(positions) частиц, вытесняя самые старые."""
+        self.positions[:len(positions), self.cursor] = positions
+        self.cursor = (self.cursor + 1) % self.length
+
+    def get_trail(self, index):
+        """Копия следа одной частицы в виде объекта Trail."""
+        trail = Trail(glm.vec3(0.0), self.length)
+        trail.positions = [glm.vec3(*position) for position in self.positions[index, self.order()]]
+        return trail
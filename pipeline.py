@@ -0,0 +1,103 @@
+import threading
+from typing import List
+
+from particles.particle_buffer import ParticleBuffer
+
+
+class FrameSnapshot:
+    """
+    Копия состояния частиц всех эмиттеров, достаточная для отрисовки одного кадра.
+    Хранилища создаются один раз и затем переиспользуются, копируются только живые частицы.
+    """
+    def __init__(self):
+        self.buffers: List[ParticleBuffer] = []
+        self.alpha = 1.0  # Доля шага для интерполяции позиций при отрисовке
+
+    def capture(self, particle_system, alpha):
+        emitters = particle_system.emitters if particle_system else []
+        del self.buffers[len(emitters):]
+        for index, emitter in enumerate(emitters):
+            emitter.materialize()
+            source = emitter.buffer
+            if index == len(self.buffers):
+                self.buffers.append(None)
+            target = self.buffers[index]
+            if target is None or target.capacity != source.capacity or target.trails.length != source.trails.length:
+                target = self.buffers[index] = ParticleBuffer(source.capacity, source.trails.length)
+            target.copy_from(source)
+        self.alpha = alpha
+
+
+class SimulationPipeline:
+    """
+    Конвейер симуляции и отрисовки. Поток симуляции считает кадр N+1 и записывает его в задний
+    снимок, пока поток OpenGL рисует кадр N из переднего. Оба потока встречаются на барьере
+    (fence), где снимки меняются местами, поэтому время кадра стремится к max(симуляция, отрисовка),
+    а не к их сумме. Изменять систему частиц из других потоков можно только под блокировкой lock.
+    """
+    def __init__(self, scene):
+        self.scene = scene
+        self.front = FrameSnapshot()
+        self.back = FrameSnapshot()
+        self.lock = threading.Lock()
+        self._fence = threading.Barrier(2, action=self._swap)
+        self._thread = None
+        self._running = False
+        # Исключение, остановившее поток симуляции; перевыбрасывается в потоке отрисовки
+        self.error = None
+
+    def _swap(self):
+        self.front, self.back = self.back, self.front
+
+    def start(self):
+        """Запускает поток симуляции."""
+        if self._thread is not None:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='simulation', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Останавливает поток симуляции; ожидающий на барьере поток отрисовки освобождается."""
+        self._running = False
+        self._fence.abort()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while self._running:
+            try:
+                with self.lock:
+                    self.scene.update_animations()
+                    self.back.capture(self.scene.particle_system, self.scene.interpolation_alpha)
+            except BaseException as error:
+                # Поток отрисовки не должен остаться ждать на барьере навсегда
+                self.error = error
+                self._running = False
+                self._fence.abort()
+                break
+            try:
+                self._fence.wait()
+            except threading.BrokenBarrierError:
+                break
+
+    def fence(self):
+        """
+        Вызывается потоком отрисовки в начале кадра: дожидается готового кадра симуляции
+        и возвращает передний снимок. После остановки конвейера возвращает последний снимок.
+        Если поток симуляции упал, его исключение выбрасывается здесь.
+        """
+        if self._running:
+            try:
+                self._fence.wait()
+            except threading.BrokenBarrierError:
+                pass
+        if self.error is not None:
+            raise self.error
+        return self.front
+
+    def render(self, renderer):
+        """Отрисовка частиц переднего снимка."""
+        for buffer in self.front.buffers:
+            renderer.draw(buffer, self.front.alpha)
@@ -7,17 +7,24 @@ from handlers import (key_pressed, key_released,
                       create_mouse_movement_handler, handle_camera_movement, reset_mouse_position,
                       handle_emitters_options)
 from materials.shader import Shader
+from particles.particle_renderer import ParticleRenderer
+from pipeline import SimulationPipeline
 from scene import Scene
 
 
 class RenderWindow:
-    def __init__(self, width, height, title):
+    def __init__(self, width, height, title, pipelined=False):
+        """
+        :param pipelined: Считать симуляцию в отдельном потоке параллельно с отрисовкой (см. SimulationPipeline).
+        """
         self.width = width
         self.height = height
         self.title = title
         self.scene = None
         self.shader = None
         self.depth_shader = None
+        self.pipelined = pipelined
+        self.pipeline = None
 
         glutInit()
         glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)
@@ -28,6 +35,7 @@ class RenderWindow:
         self.shader = Shader('data/shaders/shading.vert', 'data/shaders/shading.frag')
         self.depth_shader = Shader('data/shaders/depth.vert', 'data/shaders/depth.frag')
         self.particle_shader = Shader('data/shaders/particles.vert', 'data/shaders/particles.frag')
+        self.particle_renderer = ParticleRenderer()
 
         # Включаем режим теста глубины
         glEnable(GL_DEPTH_TEST)
@@ -38,6 +46,8 @@ class RenderWindow:
 
     def set_scene(self, scene: Scene):
         self.scene = scene
+        if self.pipelined:
+            self.pipeline = SimulationPipeline(scene)
 
     def run(self):
         # Устанавливаем обработчики
@@ -51,10 +61,17 @@ class RenderWindow:
 
         # Запускаем таймер для обновления сцены
         glutTimerFunc(16, self.update, 0)
+        if self.pipeline is not None:
+            self.pipeline.start()
         glutMainLoop()
 
     def update(self, value):
-        handle_emitters_options(self.scene.particle_system.emitters)
+        if self.pipeline is not None:
+            # Эмиттеры изменяются в потоке симуляции, поэтому настройки применяются под блокировкой
+            with self.pipeline.lock:
+                handle_emitters_options(self.scene.particle_system.emitters)
+        else:
+            handle_emitters_options(self.scene.particle_system.emitters)
         handle_camera_movement(self.scene.camera)  # Обновляем позицию камеры
         reset_mouse_position(self.width, self.height)  # Возвращаем мышь в центр экрана
         glutPostRedisplay()
@@ -81,8 +98,11 @@ class RenderWindow:
         if not self.scene or not self.shader or not self.depth_shader:
             return
 
-        # Обновляем анимации
-        self.scene.update_animations()
+        # Обновляем анимации либо забираем кадр, посчитанный потоком симуляции
+        if self.pipeline is not None:
+            self.pipeline.fence()
+        else:
+            self.scene.update_animations()
 
         # Первый проход с перспективы света для составления карты глубины для теней
         self.scene.render_depth_map(self.depth_shader)
@@ -100,8 +120,12 @@ class RenderWindow:
         self.particle_shader.set_mat4('view', self.scene.camera.get_view_matrix())
         self.particle_shader.set_mat4('model', glm.mat4(1.0))  # Единичная матрица для мировых координат
 
-        if self.scene.particle_system:
-            self.scene.particle_system.render(self.particle_shader)
+        if self.pipeline is not None:
+            self.pipeline.render(self.particle_renderer)
+        elif self.scene.particle_system:
+            if self.scene.particle_system.renderer is None:
+                self.scene.particle_system.attach_renderer(self.particle_renderer)
+            self.scene.particle_system.render(self.scene.interpolation_alpha)
 
         glDepthMask(GL_TRUE)  # Включаем запись в буфер глубины обратно
         glDisable(GL_BLEND)
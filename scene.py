@@ -2,8 +2,8 @@ from typing import List
 
 import glm
 from OpenGL.GL import *
-from OpenGL.GLUT import *
 
+from clock import SystemClock
 from light.directional_light import DirectionalLight
 from materials.depth_map import DepthMap
 from materials.shader import Shader
@@ -13,7 +13,13 @@ from shapes.shape import Shape
 
 
 class Scene:
-    def __init__(self):
+    def __init__(self, clock=None, fixed_step=1.0 / 120.0, max_substeps=8):
+        """
+        :param clock: Источник времени симуляции с методом now() в секундах. По умолчанию - SystemClock.
+        :param fixed_step: Фиксированный шаг симуляции в секундах.
+        :param max_substeps: Максимальное количество шагов симуляции за кадр. Отставание сверх него
+                             отбрасывается, чтобы после задержки симуляция не уходила в догоняющую спираль.
+        """
         # Камера сцены
         self.camera = None
 
@@ -25,9 +31,21 @@ class Scene:
 
         # Система частиц в сцене
         self.particle_system = None
-        # Время последней отрисовки сцены
-        self.last_update_time = glutGet(GLUT_ELAPSED_TIME)
-
+        # Часы симуляции и время последнего обновления сцены
+        self.clock = clock if clock is not None else SystemClock()
+        self.last_update_time = self.clock.now()
+        # Планировщик фиксированного шага: накопленное, но ещё не просимулированное время
+        self.fixed_step = fixed_step
+        self.max_substeps = max_substeps
+        self.accumulator = 0.0
+        # Доля шага между двумя последними состояниями симуляции для интерполяции при отрисовке
+        self.interpolation_alpha = 1.0
+
+        # Карта глубины для теней, создаётся при первой отрисовке в контексте OpenGL
+        self.depth_map = None
+
+    def init_gl(self):
+        """Создаёт ресурсы OpenGL сцены. Вызывается при первой отрисовке."""
         # Настраиваем задний фон как небо
         glClearColor(135.0 / 255.0, 206.0 / 255.0, 235.0 / 255.0, 1.0)  # Фоновый голубой цвет
 
@@ -49,20 +67,32 @@ class Scene:
         self.objects.append(obj)
 
     def get_delta_time(self):
-        current_time = glutGet(GLUT_ELAPSED_TIME)
-        delta_time = (current_time - self.last_update_time) / 1000.0
+        current_time = self.clock.now()
+        delta_time = current_time - self.last_update_time
         self.last_update_time = current_time
         return delta_time
 
     def update_animations(self):
-        """Обновление всех анимаций с учетом времени."""
-        delta_time = self.get_delta_time()
+        """Обновление всех анимаций фиксированными шагами за время, прошедшее с прошлого кадра."""
+        self.accumulator += self.get_delta_time()
+
+        steps = 0
+        while self.accumulator >= self.fixed_step and steps < self.max_substeps:
+            if self.particle_system:
+                self.particle_system.update(self.fixed_step)
+            self.accumulator -= self.fixed_step
+            steps += 1
+
+        # Под нагрузкой отбрасываем целые шаги, которые не успели просимулировать
+        if self.accumulator >= self.fixed_step:
+            self.accumulator %= self.fixed_step
 
-        if self.particle_system:
-            self.particle_system.update(delta_time)
+        self.interpolation_alpha = self.accumulator / self.fixed_step
 
     def render_depth_map(self, depth_shader: Shader):
         """Рендеринг сцены для создания карты глубины."""
+        if self.depth_map is None:
+            self.init_gl()
         self.depth_map.bind_for_writing()
         glClear(GL_DEPTH_BUFFER_BIT)
 
@@ -95,6 +125,8 @@ class Scene:
 
     def render_scene(self, shader: Shader):
         """Основной проход рендеринга сцены с тенями."""
+        if self.depth_map is None:
+            self.init_gl()
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
 
         # Устанавливаем матрицу вида и проекции от камеры
@@ -129,9 +161,22 @@ class Scene:
         for obj in self.objects:
             obj.render(shader)
 
-    def initialize_particle_system(self, range_of_effect=5.0):
+    def initialize_particle_system(self, range_of_effect=5.0, distance_field_resolution=None, workers=0,
+                                   lazy_trajectories=False):
+        """
+        :param range_of_effect: Радиус действия анти-аттракторов.
+        :param distance_field_resolution: Если задано, поле расстояний статических объектов сцены
+                                          запекается в сетку такого разрешения при загрузке.
+        :param workers: Количество процессов для параллельного обновления частиц (0 - без них).
+        :param lazy_trajectories: Не интегрировать пошагово частицы вне зон действия анти-аттракторов,
+                                  см. ParticleSystem.
+        """
         anti_attractor_handler = AntiAttractorHandler(self.objects, range_of_effect)
-        self.particle_system = ParticleSystem(anti_attractor_handler)
+        if distance_field_resolution is not None:
+            anti_attractor_handler.enable_distance_field(distance_field_resolution)
+            anti_attractor_handler.update_transforms()
+        self.particle_system = ParticleSystem(anti_attractor_handler, workers=workers,
+                                              lazy_trajectories=lazy_trajectories)
 
     def add_emitter_to_particle_system(self, emitter):
         if self.particle_system is None:
@@ -0,0 +1,187 @@
+import numpy as np
+
+
+class BVH:
+    """
+    Иерархия ограничивающих параллелепипедов над треугольниками меша с пакетными запросами
+    ближайшей точки: все точки обходят дерево одновременно, уровень за уровнем, а узлы,
+    которые не могут содержать точку ближе уже найденной, отсекаются векторно.
+    """
+    def __init__(self, positions, triangles, leaf_size=4):
+        """
+        :param positions: Вершины меша, массив формы (V, 3).
+        :param triangles: Индексы вершин треугольников, массив формы (T, 3).
+        :param leaf_size: Максимальное количество треугольников в листе.
+        """
+        self.a, self.b, self.c = (np.ascontiguousarray(positions[triangles[:, corner]], dtype=np.float32)
+                                  for corner in range(3))
+        face_normals = np.cross(self.b - self.a, self.c - self.a)
+        lengths = np.linalg.norm(face_normals, axis=1, keepdims=True)
+        self.face_normals = np.divide(face_normals, lengths, out=np.zeros_like(face_normals), where=lengths > 0.0)
+        self._build(leaf_size)
+
+    def _build(self, leaf_size):
+        triangle_min = np.minimum(np.minimum(self.a, self.b), self.c)
+        triangle_max = np.maximum(np.maximum(self.a, self.b), self.c)
+        centroids = (self.a + self.b + self.c) / 3.0
+
+        self.order = np.arange(len(self.a))
+        node_min, node_max, left, right, start, count = [], [], [], [], [], []
+
+        def add_node(first, last):
+            indices = self.order[first:last]
+            node_min.append(triangle_min[indices].min(axis=0))
+            node_max.append(triangle_max[indices].max(axis=0))
+            left.append(-1)
+            right.append(-1)
+            start.append(first)
+            count.append(last - first)
+            return len(node_min) - 1
+
+        stack = [(add_node(0, len(self.order)), 0, len(self.order))]
+        while stack:
+            node, first, last = stack.pop()
+            if last - first <= leaf_size:
+                continue
+            # Делим по медиане центров треугольников вдоль самой длинной оси
+            indices = self.order[first:last]
+            axis = int(np.argmax(centroids[indices].max(axis=0) - centroids[indices].min(axis=0)))
+            middle = (last - first) // 2
+            partition = np.argpartition(centroids[indices, axis], middle)
+            self.order[first:last] = indices[partition]
+            split = first + middle
+
+            left[node] = add_node(first, split)
+            right[node] = add_node(split, last)
+            count[node] = 0
+            stack.append((left[node], first, split))
+            stack.append((right[node], split, last))
+
+        self.node_min = np.array(node_min, dtype=np.float32)
+        self.node_max = np.array(node_max, dtype=np.float32)
+        self.left = np.array(left, dtype=np.int64)
+        self.right = np.array(right, dtype=np.int64)
+        self.start = np.array(start, dtype=np.int64)
+        self.count = np.array(count, dtype=np.int64)
+
+    def _box_distance2(self, points, nodes):
+        offset = np.maximum(np.maximum(self.node_min[nodes] - points, points - self.node_max[nodes]), 0.0)
+        return np.einsum('ij,ij->i', offset, offset)
+
+    def _leaf_pairs(self, queries, nodes):
+        """Разворачивает пары (точка, лист) в пары (точка, треугольник)."""
+        counts = self.count[nodes]
+        pair_queries = np.repeat(queries, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        pair_triangles = self.order[np.repeat(self.start[nodes], counts) + offsets]
+        return pair_queries, pair_triangles
+
+    def _update_best(self, points, pair_queries, pair_triangles, best_d2, best_point, best_triangle):
+        closest = closest_point_on_triangles(points[pair_queries], self.a[pair_triangles],
+                                             self.b[pair_triangles], self.c[pair_triangles])
+        offset = points[pair_queries] - closest
+        d2 = np.einsum('ij,ij->i', offset, offset)
+        # Для каждой точки берём ближайший из проверенных треугольников, если он ближе найденного ранее
+        previous = best_d2[pair_queries]
+        np.minimum.at(best_d2, pair_queries, d2)
+        better = (d2 == best_d2[pair_queries]) & (d2 < previous)
+        best_point[pair_queries[better]] = closest[better]
+        best_triangle[pair_queries[better]] = pair_triangles[better]
+
+    def closest_points(self, points, max_distance=np.inf):
+        """
+        Ближайшие точки поверхности для массива точек формы (N, 3).
+        Возвращает (квадраты расстояний, ближайшие точки, номера треугольников). Для точек дальше
+        max_distance от поверхности квадрат расстояния равен max_distance ** 2, а треугольник -1.
+        """
+        points = np.asarray(points, dtype=np.float32)
+        n = len(points)
+        best_d2 = np.full(n, max_distance ** 2, dtype=np.float32)
+        best_point = np.zeros((n, 3), dtype=np.float32)
+        best_triangle = np.full(n, -1, dtype=np.int64)
+        if n == 0 or len(self.a) == 0:
+            return best_d2, best_point, best_triangle
+
+        # Обход сразу для всех точек: спускаемся только в ближайший дочерний узел, а дальние
+        # откладываем и проверяем следующим проходом, когда оценка расстояния уже уточнена
+        deferred = [(np.arange(n), np.zeros(n, dtype=np.int64))]
+        while deferred:
+            queries = np.concatenate([pending[0] for pending in deferred])
+            nodes = np.concatenate([pending[1] for pending in deferred])
+            deferred = []
+            while len(queries):
+                keep = self._box_distance2(points[queries], nodes) <= best_d2[queries]
+                queries, nodes = queries[keep], nodes[keep]
+                leaf = self.left[nodes] < 0
+                if leaf.any():
+                    self._update_best(points, *self._leaf_pairs(queries[leaf], nodes[leaf]),
+                                      best_d2, best_point, best_triangle)
+                    queries, nodes = queries[~leaf], nodes[~leaf]
+                left, right = self.left[nodes], self.right[nodes]
+                left_first = self._box_distance2(points[queries], left) <= self._box_distance2(points[queries], right)
+                near, far = np.where(left_first, left, right), np.where(left_first, right, left)
+                if len(queries):
+                    deferred.append((queries, far))
+                nodes = near
+        return best_d2, best_point, best_triangle
+
+
+# Области Вороного треугольника в порядке разбора closest_point_on_triangles
+REGION_A, REGION_B, REGION_AB, REGION_C, REGION_AC, REGION_BC, REGION_FACE = range(7)
+
+
+def closest_point_on_triangles(p, a, b, c, return_region=False):
+    """
+    Ближайшие точки треугольников (a, b, c) к точкам p; все массивы формы (N, 3).
+    Векторный вариант алгоритма с разбором областей Вороного вершин, рёбер и грани.
+    С return_region возвращает также номера областей (REGION_*), в которые попали ближайшие точки.
+    """
+    def dot(u, v):
+        return np.einsum('ij,ij->i', u, v)
+
+    ab, ac, ap = b - a, c - a, p - a
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    bp = p - b
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    cp = p - c
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+
+    vc = d1 * d4 - d3 * d2
+    vb = d5 * d2 - d1 * d6
+    va = d3 * d6 - d5 * d4
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        v_ab = d1 / (d1 - d3)
+        w_ac = d2 / (d2 - d6)
+        w_bc = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        denominator = 1.0 / (va + vb + vc)
+        v_face = vb * denominator
+        w_face = vc * denominator
+
+    conditions = [
+        (d1 <= 0.0) & (d2 <= 0.0),                            # вершина a
+        (d3 >= 0.0) & (d4 <= d3),                             # вершина b
+        (vc <= 0.0) & (d1 >= 0.0) & (d3 <= 0.0),              # ребро ab
+        (d6 >= 0.0) & (d5 <= d6),                             # вершина c
+        (vb <= 0.0) & (d2 >= 0.0) & (d6 <= 0.0),              # ребро ac
+        (va <= 0.0) & ((d4 - d3) >= 0.0) & ((d5 - d6) >= 0.0),  # ребро bc
+    ]
+    choices = [
+        a,
+        b,
+        a + ab * v_ab[:, None],
+        c,
+        a + ac * w_ac[:, None],
+        b + (c - b) * w_bc[:, None],
+    ]
+    face = a + ab * v_face[:, None] + ac * w_face[:, None]
+    condition = np.stack(conditions, axis=1)
+    result = face
+    # Проходим области в обратном порядке, чтобы более ранние имели приоритет, как в исходном алгоритме
+    for index in reversed(range(len(choices))):
+        result = np.where(condition[:, index, None], choices[index], result)
+    if return_region:
+        # Первая выполненная область, как при выборе точки; грань, если не выполнена ни одна
+        region = np.where(condition.any(axis=1), np.argmax(condition, axis=1), REGION_FACE)
+        return result, region
+    return result
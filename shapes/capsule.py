@@ -0,0 +1,95 @@
+from OpenGL.GL import *
+
+from shapes import procedural, sdf
+from shapes.collider import Collider
+from shapes.shape import Shape
+
+
+class Capsule(Shape, Collider):
+    def __init__(self, radius=1.0, height=2.0, slices=30, stacks=8,
+                 position=[0.0, 0.0, 0.0], scale=1.0, rotation=[0.0, 0.0, 0.0], material=None,
+                 anti_attractor=True):
+        """
+        :param radius: Радиус полусфер и боковой поверхности.
+        :param height: Расстояние между центрами полусфер вдоль локальной оси Y (от 0 до height).
+        :param stacks: Количество поясов в каждой полусфере.
+        """
+        super().__init__(position, scale, rotation, material=material)
+        self.anti_attractor = anti_attractor
+        self._radius = radius
+        self._height = height
+        self.slices = slices
+        self.stacks = stacks
+        self.vertices = None
+        self.indices = None
+
+    @property
+    def radius(self):
+        return self._radius
+
+    @radius.setter
+    def radius(self, value):
+        self._radius = value
+        self._mesh_dirty = True
+
+    @property
+    def height(self):
+        return self._height
+
+    @height.setter
+    def height(self, value):
+        self._height = value
+        self._mesh_dirty = True
+
+    @property
+    def geometry_key(self):
+        return self._radius, self._height
+
+    def local_signed_distance(self, local_points, max_distance=None):
+        # Масштаб фигуры не учитывается, как и у цилиндра
+        return sdf.capsule(local_points, self.radius, self.height)
+
+    def sdf_primitive(self):
+        return sdf.CAPSULE, (self.radius, self.height, 0.0)
+
+    def local_bounds(self):
+        return [-self.radius, -self.radius, -self.radius], [self.radius, self.height + self.radius, self.radius]
+
+    def generate_mesh(self):
+        """Вершины, нормали, текстурные координаты и индексы капсулы."""
+        return procedural.capsule(self.radius, self.height, self.slices, self.stacks)
+
+    def setup_mesh(self):
+        """Настройка VAO, VBO и EBO капсулы."""
+        if self.VAO is None:
+            self.create_buffers()
+        self.vertices, self.indices = self.generate_mesh()
+        glBindVertexArray(self.VAO)
+
+        # VBO
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, self.vertices, GL_STATIC_DRAW)
+
+        # EBO
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.indices.nbytes, self.indices, GL_STATIC_DRAW)
+
+        # Атрибуты вершин
+        # Позиции
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, 8 * self.vertices.itemsize, ctypes.c_void_p(0))
+        # Нормали
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, 8 * self.vertices.itemsize, ctypes.c_void_p(3 * self.vertices.itemsize))
+        # Текстурные координаты
+        glEnableVertexAttribArray(2)
+        glVertexAttribPointer(2, 2, GL_FLOAT, GL_FALSE, 8 * self.vertices.itemsize, ctypes.c_void_p(6 * self.vertices.itemsize))
+
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindVertexArray(0)
+
+    def draw_mesh(self, shader):
+        """Отрисовка капсулы."""
+        glBindVertexArray(self.VAO)
+        glDrawElements(GL_TRIANGLES, len(self.indices), GL_UNSIGNED_INT, None)
+        glBindVertexArray(0)
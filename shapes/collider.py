@@ -0,0 +1,90 @@
+from abc import ABC, abstractmethod
+
+import glm
+import numpy as np
+
+
+class Collider(ABC):
+    """
+    Примесь к Shape для фигур, отталкивающих частицы. Фигура описывает только знаковое
+    расстояние в своей локальной системе координат, а перевод точек и градиентов между
+    мировой и локальной системами выполняется здесь для всех коллайдеров одинаково.
+    """
+    # Участвует ли фигура в отталкивании частиц
+    anti_attractor = True
+    # Можно ли запекать коллайдер в поле расстояний (AntiAttractorHandler.enable_distance_field).
+    # Подвижным коллайдерам стоит сбросить флаг; изменившиеся коллайдеры исключаются из поля и так
+    static = True
+
+    @abstractmethod
+    def local_signed_distance(self, local_points, max_distance=None):
+        """
+        Знаковое расстояние до поверхности для точек в локальной системе фигуры (без масштаба Shape,
+        если фигура не учитывает его сама) и направления роста расстояния, см. shapes.sdf.
+        Фигуры с дорогим поиском могут возвращать бесконечность для точек дальше max_distance.
+        """
+        pass
+
+    @abstractmethod
+    def local_bounds(self):
+        """Ограничивающий параллелепипед в локальной системе фигуры: (минимум, максимум)."""
+        pass
+
+    def sdf_primitive(self):
+        """
+        Описание фигуры для скомпилированных ядер: (вид из shapes.sdf, три параметра функции
+        расстояния) или None, если расстояние считается только методом local_signed_distance.
+        """
+        return None
+
+    @property
+    def geometry_key(self):
+        """Параметры формы, изменение которых меняет поле расстояний (помимо положения и поворота)."""
+        return ()
+
+    @property
+    def collider_version(self):
+        """Значение, меняющееся при любом изменении поля расстояний коллайдера."""
+        return self.transform_version, self.geometry_key
+
+    def geometry_signature(self):
+        """Полное описание геометрии коллайдера, пригодное для хеширования."""
+        return (type(self).__name__, tuple(self.position), tuple(self.rotation), self.scale, self.geometry_key)
+
+    def _collider_matrices(self):
+        """Матрицы поворота в виде массивов NumPy для умножения строк-точек справа."""
+        cache = getattr(self, '_collider_matrix_cache', None)
+        if cache is None or cache[0] != self.transform_version:
+            rotation = np.array(glm.mat3(self.rotation_matrix), dtype=np.float32).T
+            inv_rotation = np.array(glm.mat3(self.inverse_rotation_matrix), dtype=np.float32).T
+            cache = (self.transform_version, rotation, inv_rotation)
+            self._collider_matrix_cache = cache
+        return cache[1], cache[2]
+
+    def to_local(self, points):
+        _, inv_rotation = self._collider_matrices()
+        return (points - np.asarray(self.position, dtype=np.float32)) @ inv_rotation
+
+    def signed_distance(self, points, max_distance=None):
+        """
+        Знаковое расстояние от точек в мировой системе до поверхности и единичные градиенты
+        расстояния (нормали, направленные от поверхности) для массива точек формы (N, 3).
+        :param max_distance: Расстояние, дальше которого точное значение не нужно.
+        """
+        rotation, _ = self._collider_matrices()
+        distance, direction = self.local_signed_distance(self.to_local(points), max_distance)
+        gradient = (direction @ rotation).astype(np.float32, copy=False)
+        length = np.linalg.norm(gradient, axis=1, keepdims=True)
+        np.divide(gradient, length, out=gradient, where=length > 0.0)
+        return distance, gradient
+
+    def get_bounds(self):
+        """Ограничивающий параллелепипед в мировых координатах, выровненный по осям: (минимум, максимум)."""
+        lower, upper = (np.asarray(bound, dtype=np.float32) for bound in self.local_bounds())
+        corners = np.array([[x, y, z]
+                            for x in (lower[0], upper[0])
+                            for y in (lower[1], upper[1])
+                            for z in (lower[2], upper[2])], dtype=np.float32)
+        rotation, _ = self._collider_matrices()
+        world_corners = corners @ rotation + np.asarray(self.position, dtype=np.float32)
+        return world_corners.min(axis=0), world_corners.max(axis=0)
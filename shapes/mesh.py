@@ -0,0 +1,202 @@
+import numpy as np
+from OpenGL.GL import *
+from stl import mesh as stl_mesh
+
+from shapes.bvh import BVH, closest_point_on_triangles
+from shapes.collider import Collider
+from shapes.mesh_cache import file_key, load_mesh
+from shapes.shape import Shape
+
+
+class Mesh(Shape, Collider):
+    """
+    Треугольный меш, загружаемый из STL. Совпадающие вершины треугольников сливаются в одну,
+    нормали вершин считаются по нормалям граней с весом их площади. Для отталкивания частиц
+    по треугольникам строится BVH, ближайшие точки ищутся сразу для всего массива частиц.
+    Знак расстояния до замкнутого меша определяется по псевдонормалям, у открытого меша (с рёбрами,
+    принадлежащими одному треугольнику) внутренность не определена, и расстояние берётся без знака.
+    """
+    def __init__(self, path, position=[0.0, 0.0, 0.0], scale=1.0, rotation=[0.0, 0.0, 0.0], material=None,
+                 anti_attractor=True, weld_tolerance=1e-5, use_cache=True):
+        """
+        :param path: Путь к файлу STL (текстовому или бинарному).
+        :param anti_attractor: Отталкивает ли меш частицы.
+        :param weld_tolerance: Допуск слияния вершин относительно размера меша.
+        :param use_cache: Хранить разобранный меш на диске между запусками.
+        """
+        super().__init__(position, scale, rotation, material)
+        self.anti_attractor = anti_attractor
+        self.path = path
+        self.weld_tolerance = weld_tolerance
+        # Хеш содержимого и время изменения файла на момент загрузки
+        self.file_key = file_key(path)
+
+        # Разобранный и сваренный меш кэшируется на диске по содержимому файла
+        self.vertices, self.indices = load_mesh(('stl', self.file_key, weld_tolerance),
+                                                lambda: self.load_stl(path, weld_tolerance), use_cache)
+        self.positions = self.vertices[:, 0:3]
+        self.normals = self.vertices[:, 3:6]
+        self.triangles = self.indices.reshape(-1, 3)
+
+        self.bvh = BVH(self.positions, self.triangles)
+        self.closed = self.is_closed(self.triangles)
+        self.pseudo_normals = self.compute_pseudo_normals(self.positions, self.triangles) if self.closed else None
+
+    @classmethod
+    def load_stl(cls, path, weld_tolerance):
+        """Читает STL и возвращает вершины (позиция, нормаль, текстурные координаты) и индексы."""
+        triangles = stl_mesh.Mesh.from_file(path).vectors.astype(np.float32)
+        positions, triangles = cls.weld(triangles, weld_tolerance)
+
+        # Вершины в общем для фигур формате: позиция, нормаль, текстурные координаты (у STL их нет)
+        vertices = np.zeros((len(positions), 8), dtype=np.float32)
+        vertices[:, 0:3] = positions
+        vertices[:, 3:6] = cls.compute_normals(positions, triangles)
+        return vertices, triangles.astype(np.uint32).ravel()
+
+    @staticmethod
+    def weld(triangles, tolerance):
+        """
+        Сливает вершины треугольников, совпадающие с точностью до tolerance от размера меша,
+        и удаляет вырожденные треугольники. Возвращает (вершины (V, 3), индексы (T, 3)).
+        """
+        corners = triangles.reshape(-1, 3)
+        extent = float(np.max(corners.max(axis=0) - corners.min(axis=0))) if len(corners) else 0.0
+        step = max(extent * tolerance, np.finfo(np.float32).tiny)
+        quantized = np.round(corners / step).astype(np.int64)
+        _, first, inverse = np.unique(quantized, axis=0, return_index=True, return_inverse=True)
+        positions = corners[first]
+        indices = inverse.reshape(-1, 3)
+
+        degenerate = (indices[:, 0] == indices[:, 1]) | (indices[:, 1] == indices[:, 2]) | \
+                     (indices[:, 2] == indices[:, 0])
+        return positions, indices[~degenerate]
+
+    @staticmethod
+    def compute_normals(positions, triangles):
+        """Нормали вершин как нормированная сумма нормалей смежных граней, взвешенных их площадью."""
+        a, b, c = (positions[triangles[:, corner]] for corner in range(3))
+        # Длина векторного произведения равна удвоенной площади, поэтому вес площади получается сам
+        face_normals = np.cross(b - a, c - a)
+        normals = np.zeros_like(positions)
+        for corner in range(3):
+            np.add.at(normals, triangles[:, corner], face_normals)
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        np.divide(normals, lengths, out=normals, where=lengths > 0.0)
+        return normals
+
+    @staticmethod
+    def is_closed(triangles):
+        """
+        Замкнут ли меш: каждое ребро принадлежит ровно двум треугольникам, обходящим его
+        в противоположных направлениях.
+        """
+        if len(triangles) == 0:
+            return False
+        edges = triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2).astype(np.int64)
+        count = int(edges.max()) + 1
+        forward = edges[:, 0] * count + edges[:, 1]
+        backward = edges[:, 1] * count + edges[:, 0]
+        return len(np.unique(forward)) == len(forward) and bool(np.isin(backward, forward).all())
+
+    @staticmethod
+    def compute_pseudo_normals(positions, triangles):
+        """
+        Псевдонормали элементов каждого треугольника (Bærentzen, Aanæs): вершин - сумма нормалей
+        смежных граней с весом угла при вершине, рёбер - сумма нормалей двух граней, грани - её нормаль.
+        Возвращает массив формы (T, 7, 3) в порядке областей closest_point_on_triangles. Для точки
+        снаружи замкнутого меша вектор от ближайшей точки образует острый угол с псевдонормалью
+        того элемента, на котором она лежит, а для точки внутри - тупой.
+        """
+        corners = [positions[triangles[:, corner]].astype(np.float64) for corner in range(3)]
+        face_normals = np.cross(corners[1] - corners[0], corners[2] - corners[0])
+        lengths = np.linalg.norm(face_normals, axis=1, keepdims=True)
+        np.divide(face_normals, lengths, out=face_normals, where=lengths > 0.0)
+
+        vertex_normals = np.zeros((len(positions), 3))
+        for corner in range(3):
+            u = corners[(corner + 1) % 3] - corners[corner]
+            v = corners[(corner + 2) % 3] - corners[corner]
+            angle = np.arctan2(np.linalg.norm(np.cross(u, v), axis=1), np.einsum('ij,ij->i', u, v))
+            np.add.at(vertex_normals, triangles[:, corner], face_normals * angle[:, None])
+
+        # Рёбра ab, ac, bc каждого треугольника; одинаковые рёбра соседей получают общий номер
+        edges = np.sort(triangles[:, [0, 1, 0, 2, 1, 2]].reshape(-1, 2), axis=1)
+        _, edge_index = np.unique(edges, axis=0, return_inverse=True)
+        edge_index = edge_index.reshape(-1, 3)
+        edge_normals = np.zeros((int(edge_index.max()) + 1, 3))
+        for edge in range(3):
+            np.add.at(edge_normals, edge_index[:, edge], face_normals)
+
+        a, b, c = (vertex_normals[triangles[:, corner]] for corner in range(3))
+        ab, ac, bc = (edge_normals[edge_index[:, edge]] for edge in range(3))
+        return np.stack([a, b, ab, c, ac, bc, face_normals], axis=1).astype(np.float32)
+
+    @property
+    def geometry_key(self):
+        # Содержимое файла и допуск слияния, а не только путь: иначе поле расстояний из дискового
+        # кэша переиспользуется после правки STL
+        return self.path, self.file_key, self.weld_tolerance, len(self.triangles)
+
+    def local_signed_distance(self, local_points, max_distance=None):
+        # Меш масштабируется вместе с фигурой, поэтому поиск ведётся в системе без масштаба
+        points = local_points / self.scale
+        limit = np.inf if max_distance is None else max_distance / self.scale
+        distance2, closest, triangle = self.bvh.closest_points(points, limit)
+
+        distance = np.full(len(points), np.inf, dtype=np.float32)
+        direction = np.zeros((len(points), 3), dtype=np.float32)
+        found = triangle >= 0
+        offset = points[found] - closest[found]
+        face_normal = self.bvh.face_normals[triangle[found]]
+        if self.closed:
+            # Знак по псевдонормали вершины, ребра или грани, на которой лежит ближайшая точка: нормаль
+            # одной грани ошибается у рёбер и вершин, где ближайшая точка общая для нескольких граней
+            triangles = triangle[found]
+            _, region = closest_point_on_triangles(points[found], self.bvh.a[triangles], self.bvh.b[triangles],
+                                                   self.bvh.c[triangles], return_region=True)
+            inside = np.einsum('ij,ij->i', offset, self.pseudo_normals[triangles, region]) < 0.0
+            # Точка вне ограничивающего параллелепипеда меша не может быть внутри него
+            inside &= np.all((points[found] >= self.positions.min(axis=0)) &
+                             (points[found] <= self.positions.max(axis=0)), axis=1)
+            sign = np.where(inside, -1.0, 1.0).astype(np.float32)
+        else:
+            sign = np.ones(len(offset), dtype=np.float32)
+        distance[found] = np.sqrt(distance2[found]) * sign * self.scale
+        direction[found] = np.where(distance2[found, None] > 0.0, offset * sign[:, None], face_normal)
+        return distance, direction
+
+    def local_bounds(self):
+        return self.positions.min(axis=0) * self.scale, self.positions.max(axis=0) * self.scale
+
+    def setup_mesh(self):
+        """Настройка VAO, VBO и EBO для меша."""
+        if self.VAO is None:
+            self.create_buffers()
+        glBindVertexArray(self.VAO)
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.VBO)
+        glBufferData(GL_ARRAY_BUFFER, self.vertices.nbytes, self.vertices, GL_STATIC_DRAW)
+
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.EBO)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, self.indices.nbytes, self.indices, GL_STATIC_DRAW)
+
+        stride = 8 * self.vertices.itemsize
+        # Позиции
+        glEnableVertexAttribArray(0)
+        glVertexAttribPointer(0, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(0))
+        # Нормали
+        glEnableVertexAttribArray(1)
+        glVertexAttribPointer(1, 3, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(3 * self.vertices.itemsize))
+        # Текстурные координаты
+        glEnableVertexAttribArray(2)
+        glVertexAttribPointer(2, 2, GL_FLOAT, GL_FALSE, stride, ctypes.c_void_p(6 * self.vertices.itemsize))
+
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindVertexArray(0)
+
+    def draw_mesh(self, shader):
+        """Отрисовка меша с использованием шейдера."""
+        glBindVertexArray(self.VAO)
+        glDrawElements(GL_TRIANGLES, len(self.indices), GL_UNSIGNED_INT, None)
+        glBindVertexArray(0)
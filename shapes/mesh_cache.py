@@ -0,0 +1,47 @@
+import hashlib
+import os
+
+import numpy as np
+
+from cache import get_cache_path, hash_key
+
+# Меняется при изменении формата вершин или алгоритмов генерации, чтобы не подхватить старый кэш
+MESH_CACHE_VERSION = 1
+
+
+def file_key(path):
+    """Ключ исходного файла меша: хеш содержимого и время изменения."""
+    with open(path, 'rb') as file:
+        digest = hashlib.sha1(file.read()).hexdigest()
+    return digest, os.stat(path).st_mtime_ns
+
+
+def load_mesh(key_parts, generate, use_cache=True):
+    """
+    Возвращает готовые массивы меша (вершины float32 (N, 8), индексы uint32), при наличии
+    отображая их в память из дискового кэша. Иначе вызывает generate() и сохраняет результат.
+
+    :param key_parts: Параметры генератора или ключ исходного файла, однозначно задающие меш.
+    :param generate: Функция без аргументов, возвращающая (вершины, индексы).
+    :param use_cache: Читать и записывать кэш на диске.
+    """
+    if not use_cache:
+        vertices, indices = generate()
+        return np.asarray(vertices, dtype=np.float32).reshape(-1, 8), np.asarray(indices, dtype=np.uint32).ravel()
+
+    key = hash_key(MESH_CACHE_VERSION, *key_parts)
+    vertices_path = get_cache_path('meshes', key, 'vertices.npy')
+    indices_path = get_cache_path('meshes', key, 'indices.npy')
+    if os.path.exists(vertices_path) and os.path.exists(indices_path):
+        return np.load(vertices_path, mmap_mode='r'), np.load(indices_path, mmap_mode='r')
+
+    vertices, indices = generate()
+    vertices = np.ascontiguousarray(vertices, dtype=np.float32).reshape(-1, 8)
+    indices = np.ascontiguousarray(indices, dtype=np.uint32).ravel()
+    # Запись через временный файл, чтобы прерванный запуск не оставил повреждённый кэш
+    for path, array in ((indices_path, indices), (vertices_path, vertices)):
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as file:
+            np.save(file, array)
+        os.replace(temporary_path, path)
+    return vertices, indices
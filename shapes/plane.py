@@ -1,12 +1,19 @@
 import numpy as np
 from OpenGL.GL import *
 
+from shapes import sdf
+from shapes.collider import Collider
 from shapes.shape import Shape
 
 
-class Plane(Shape):
-    def __init__(self, position=[0.0, 0.0, 0.0], scale=1.0, rotation=[0.0, 0.0, 0.0], material=None):
+class Plane(Shape, Collider):
+    def __init__(self, position=[0.0, 0.0, 0.0], scale=1.0, rotation=[0.0, 0.0, 0.0], material=None,
+                 anti_attractor=False):
+        """
+        :param anti_attractor: Отталкивает ли плоскость частицы. По умолчанию плоскость служит только полом.
+        """
         super().__init__(position, scale, rotation, material)
+        self.anti_attractor = anti_attractor
         self.vertices = [
             #  positions          normals      texcoords
             -0.5, 0.0, -0.5,   0.0, 1.0, 0.0,  0.0, 0.0,  # Bottom-left
@@ -22,10 +29,20 @@ class Plane(Shape):
         ]
         self.indices = np.array(self.indices, dtype=np.uint32)
 
-        self.setup_mesh()
+    def local_signed_distance(self, local_points, max_distance=None):
+        # Плоскость - квадрат 1x1 в плоскости XZ, растянутый на scale
+        return sdf.box(local_points, [0.5 * self.scale, 0.0, 0.5 * self.scale])
+
+    def sdf_primitive(self):
+        return sdf.BOX, (0.5 * self.scale, 0.0, 0.5 * self.scale)
+
+    def local_bounds(self):
+        return [-0.5 * self.scale, 0.0, -0.5 * self.scale], [0.5 * self.scale, 0.0, 0.5 * self.scale]
 
     def setup_mesh(self):
         """Настройка VAO, VBO и EBO для плоскости."""
+        if self.VAO is None:
+            self.create_buffers()
         glBindVertexArray(self.VAO)
 
         # VBO
@@ -0,0 +1,96 @@
+import numpy as np
+
+# Вершина процедурного меша: позиция (3), нормаль (3), текстурные координаты (2)
+VERTEX_SIZE = 8
+
+
+def lathe(profile, slices, normals=None):
+    """
+    Поверхность вращения профиля вокруг оси Y. Каждый сектор получает собственные вершины,
+    по K вершин профиля на угле начала сектора и K на угле его конца.
+
+    :param profile: Точки профиля (радиус, высота), массив формы (K, 2), снизу вверх.
+    :param slices: Количество секторов по окружности.
+    :param normals: Нормали профиля (радиальная компонента, компонента Y) формы (K, 2).
+                    По умолчанию нормали горизонтальны, как у боковой поверхности цилиндра.
+    :return: Вершины float32 формы (slices * 2 * K, 8) и индексы uint32.
+    """
+    profile = np.asarray(profile, dtype=np.float64)
+    points = len(profile)
+    normals = np.array([[1.0, 0.0]] * points if normals is None else normals, dtype=np.float64)
+
+    # Углы начала и конца каждого сектора: (slices, 2)
+    steps = np.arange(slices)[:, None] + np.arange(2)[None, :]
+    theta = 2.0 * np.pi * steps / slices
+    cos, sin = np.cos(theta)[..., None], np.sin(theta)[..., None]
+
+    vertices = np.empty((slices, 2, points, VERTEX_SIZE), dtype=np.float64)
+    vertices[..., 0] = profile[:, 0] * cos
+    vertices[..., 1] = profile[:, 1]
+    vertices[..., 2] = profile[:, 0] * sin
+    normal = np.stack(np.broadcast_arrays(normals[:, 0] * cos, normals[:, 1], normals[:, 0] * sin), axis=-1)
+    length = np.linalg.norm(normal, axis=-1, keepdims=True)
+    vertices[..., 3:6] = np.divide(normal, length, out=np.zeros_like(normal), where=length > 0.0)
+    vertices[..., 6] = (steps / slices)[..., None]
+    vertices[..., 7] = np.arange(points) / max(points - 1, 1)
+
+    # Два треугольника на каждый отрезок профиля внутри сектора
+    base = (np.arange(slices) * 2 * points)[:, None] + np.arange(points - 1)[None, :]
+    indices = np.stack([base, base + 1, base + points,
+                        base + points, base + 1, base + points + 1], axis=-1)
+    return vertices.reshape(-1, VERTEX_SIZE).astype(np.float32), indices.reshape(-1).astype(np.uint32)
+
+
+def disk(radius, height, slices, facing_up=True):
+    """
+    Горизонтальный круг на высоте height: центральная вершина и кольцо из slices вершин,
+    соединённые веером треугольников. Обход выбирается так, чтобы лицевая сторона смотрела
+    вверх или вниз.
+
+    :return: Вершины float32 формы (slices + 1, 8) и индексы uint32.
+    """
+    theta = 2.0 * np.pi * np.arange(slices) / slices
+    cos, sin = np.cos(theta), np.sin(theta)
+
+    vertices = np.empty((slices + 1, VERTEX_SIZE), dtype=np.float64)
+    vertices[0] = [0.0, height, 0.0, 0.0, 1.0 if facing_up else -1.0, 0.0, 0.5, 0.5]
+    vertices[1:, 0] = radius * cos
+    vertices[1:, 1] = height
+    vertices[1:, 2] = radius * sin
+    vertices[1:, 3:6] = vertices[0, 3:6]
+    vertices[1:, 6] = 0.5 + 0.5 * cos
+    vertices[1:, 7] = 0.5 + 0.5 * sin
+
+    ring = np.arange(1, slices + 1)
+    next_ring = np.roll(ring, -1)
+    center = np.zeros(slices, dtype=np.int64)
+    if facing_up:
+        indices = np.stack([center, next_ring, ring], axis=-1)
+    else:
+        indices = np.stack([center, ring, next_ring], axis=-1)
+    return vertices.astype(np.float32), indices.reshape(-1).astype(np.uint32)
+
+
+def combine(*parts):
+    """Объединяет части меша (вершины, индексы) в один меш, сдвигая индексы каждой части."""
+    vertices, indices, offset = [], [], 0
+    for part_vertices, part_indices in parts:
+        vertices.append(part_vertices)
+        indices.append(part_indices + np.uint32(offset))
+        offset += len(part_vertices)
+    return np.concatenate(vertices), np.concatenate(indices)
+
+
+def capsule(radius, height, slices, stacks):
+    """
+    Капсула: отрезок оси Y от 0 до height, раздутый на radius, - две полусферы по stacks
+    поясов, соединённые боковой поверхностью цилиндра. При height = 0 получается сфера.
+
+    :return: Вершины float32 и индексы uint32, как у lathe.
+    """
+    angles = np.linspace(-0.5 * np.pi, 0.0, stacks + 1)
+    ring = np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+    top = ring[::-1] * [1.0, -1.0]
+    normals = np.concatenate([ring, top])
+    profile = normals * radius + np.repeat([[0.0, 0.0], [0.0, height]], stacks + 1, axis=0)
+    return lathe(profile, slices, normals)
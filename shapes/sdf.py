@@ -0,0 +1,87 @@
+"""
+Векторные функции знакового расстояния для точек в локальной системе фигуры.
+Каждая функция принимает массив точек формы (N, 3) и возвращает расстояния формы (N,)
+и направления наискорейшего роста расстояния формы (N, 3). Направления не обязательно
+нормированы - их нормирует Collider после перевода в мировую систему координат.
+"""
+import numpy as np
+
+# Виды фигур для скомпилированных ядер (Collider.sdf_primitive), 0 - фигура без такого описания
+CYLINDER = 1
+BOX = 2
+SPHERE = 3
+CAPSULE = 4
+
+
+def cylinder(local, base_radius, top_radius, height):
+    """
+    Усечённый конус вдоль оси Y от 0 до height. Повторяет исходный расчёт анти-аттрактора:
+    нормаль боковой поверхности горизонтальна, у рёбер оснований к ней добавляется ось.
+    """
+    x, y, z = local[:, 0], local[:, 1], local[:, 2]
+
+    # Радиус цилиндра на высоте проекции точки на ось
+    clamped_y = np.clip(y, 0.0, height)
+    current_radius = base_radius + (top_radius - base_radius) * (clamped_y / height)
+
+    distance_to_side_surface = np.hypot(x, z) - current_radius
+    distance_to_top = y - height
+    distance_to_bottom = -y
+
+    above = y > height
+    below = y < 0.0
+    beside = distance_to_side_surface > 0.0
+
+    distance = np.where(
+        above,
+        np.where(beside, np.hypot(distance_to_side_surface, distance_to_top), distance_to_top),
+        np.where(
+            below,
+            np.where(beside, np.hypot(distance_to_side_surface, distance_to_bottom), distance_to_bottom),
+            distance_to_side_surface
+        )
+    )
+
+    # Над и под основаниями нормаль смотрит вдоль оси, если точка ровно над основанием
+    on_cap = (above | below) & ~beside
+    direction = np.empty_like(local)
+    direction[:, 0] = np.where(on_cap, 0.0, x)
+    direction[:, 1] = np.where(above, 1.0, np.where(below, -1.0, 0.0))
+    direction[:, 2] = np.where(on_cap, 0.0, z)
+    return distance, direction
+
+
+def box(local, half_extents):
+    """Параллелепипед с центром в начале координат и полуразмерами half_extents."""
+    half_extents = np.asarray(half_extents, dtype=local.dtype)
+    sign = np.where(local >= 0.0, 1.0, -1.0).astype(local.dtype)
+    q = np.abs(local) - half_extents
+    outside = np.maximum(q, 0.0)
+    outside_length = np.linalg.norm(outside, axis=1)
+    max_q = q.max(axis=1)
+    distance = outside_length + np.minimum(max_q, 0.0)
+
+    # Снаружи - направление от ближайшей точки поверхности, внутри - к ближайшей грани
+    direction = sign * outside
+    inside = outside_length == 0.0
+    if inside.any():
+        nearest_face = np.argmax(q[inside], axis=1)
+        inside_direction = np.zeros((int(inside.sum()), 3), dtype=local.dtype)
+        inside_direction[np.arange(len(nearest_face)), nearest_face] = \
+            sign[inside][np.arange(len(nearest_face)), nearest_face]
+        direction[inside] = inside_direction
+    return distance, direction
+
+
+def sphere(local, radius):
+    """Сфера с центром в начале координат."""
+    length = np.linalg.norm(local, axis=1)
+    return length - radius, local.copy()
+
+
+def capsule(local, radius, height):
+    """Капсула: отрезок оси Y от 0 до height, раздутый на radius."""
+    closest = np.zeros_like(local)
+    closest[:, 1] = np.clip(local[:, 1], 0.0, height)
+    offset = local - closest
+    return np.linalg.norm(offset, axis=1) - radius, offset
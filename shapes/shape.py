@@ -9,18 +9,113 @@ from materials.shader import Shader
 
 class Shape(ABC):
     def __init__(self, position, scale, rotation, material=None):
-        self.position = position
-        self.scale = scale
-        self.rotation = rotation
+        self._position = glm.vec3(*position)
+        self._rotation = glm.vec3(*rotation)
+        self._scale = scale
         self.material = material if material else Material()
 
+        # Кэш мировых преобразований, пересчитывается только после изменения положения, поворота или масштаба
+        self._transform_dirty = True
+        self._transform_version = 0
+        self._model_matrix = glm.mat4(1.0)
+        self._inverse_model_matrix = glm.mat4(1.0)
+        self._rotation_matrix = glm.mat4(1.0)
+        self._inverse_rotation_matrix = glm.mat4(1.0)
+
+        # Объекты OpenGL создаются при первой отрисовке, чтобы фигуры можно было использовать без контекста
+        self.VAO = None
+        self.VBO = None
+        self.EBO = None
+        self._mesh_dirty = True
+
+    @property
+    def position(self):
+        return self._position
+
+    @position.setter
+    def position(self, value):
+        self._position = glm.vec3(*value)
+        self.invalidate_transform()
+
+    @property
+    def rotation(self):
+        """Углы поворота вокруг осей X, Y, Z в градусах."""
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, value):
+        self._rotation = glm.vec3(*value)
+        self.invalidate_transform()
+
+    @property
+    def scale(self):
+        return self._scale
+
+    @scale.setter
+    def scale(self, value):
+        self._scale = value
+        self.invalidate_transform()
+
+    def invalidate_transform(self):
+        """
+        Помечает кэш преобразований устаревшим. Вызывается сеттерами автоматически,
+        вручную нужен только после изменения компонент position или rotation на месте.
+        """
+        self._transform_dirty = True
+        self._transform_version += 1
+
+    @property
+    def transform_version(self):
+        """Счётчик изменений преобразования, позволяет внешним кэшам замечать перемещение фигуры."""
+        return self._transform_version
+
+    @property
+    def model_matrix(self):
+        self._update_transform()
+        return self._model_matrix
+
+    @property
+    def inverse_model_matrix(self):
+        self._update_transform()
+        return self._inverse_model_matrix
+
+    @property
+    def rotation_matrix(self):
+        """Матрица только поворота фигуры (без переноса и масштаба)."""
+        self._update_transform()
+        return self._rotation_matrix
+
+    @property
+    def inverse_rotation_matrix(self):
+        self._update_transform()
+        return self._inverse_rotation_matrix
+
+    def _update_transform(self):
+        if not self._transform_dirty:
+            return
+        rotation = glm.mat4(1.0)
+        rotation = glm.rotate(rotation, glm.radians(self._rotation[0]), glm.vec3(1.0, 0.0, 0.0))
+        rotation = glm.rotate(rotation, glm.radians(self._rotation[1]), glm.vec3(0.0, 1.0, 0.0))
+        rotation = glm.rotate(rotation, glm.radians(self._rotation[2]), glm.vec3(0.0, 0.0, 1.0))
+
+        model = glm.translate(glm.mat4(1.0), self._position) * rotation
+        model = glm.scale(model, glm.vec3(self._scale))
+
+        self._rotation_matrix = rotation
+        self._inverse_rotation_matrix = glm.inverse(rotation)
+        self._model_matrix = model
+        self._inverse_model_matrix = glm.inverse(model)
+        self._transform_dirty = False
+
+    def create_buffers(self):
+        """Создаёт собственные VAO, VBO и EBO фигуры."""
         self.VAO = glGenVertexArrays(1)
         self.VBO = glGenBuffers(1)
         self.EBO = glGenBuffers(1)
 
     @abstractmethod
     def setup_mesh(self):
-        """Настройка VAO, VBO, EBO для геометрии."""
+        """Настройка VAO, VBO, EBO для геометрии. Вызывается при первой отрисовке."""
         pass
 
     @abstractmethod
@@ -30,15 +125,11 @@ class Shape(ABC):
 
     def render(self, shader: Shader):
         """Отрисовка фигуры с применением трансформаций и материала."""
-        # Создаем матрицу модели
-        model = glm.mat4(1.0)
-        model = glm.translate(model, glm.vec3(*self.position))
-        model = glm.rotate(model, glm.radians(self.rotation[0]), glm.vec3(1.0, 0.0, 0.0))
-        model = glm.rotate(model, glm.radians(self.rotation[1]), glm.vec3(0.0, 1.0, 0.0))
-        model = glm.rotate(model, glm.radians(self.rotation[2]), glm.vec3(0.0, 0.0, 1.0))
-        model = glm.scale(model, glm.vec3(self.scale))
-
-        shader.set_mat4('model', model)
+        if self._mesh_dirty:
+            self.setup_mesh()
+            self._mesh_dirty = False
+
+        shader.set_mat4('model', self.model_matrix)
 
         # Применяем материал
         self.material.apply(shader)
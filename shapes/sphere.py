@@ -0,0 +1,16 @@
+from shapes import sdf
+from shapes.capsule import Capsule
+
+
+class Sphere(Capsule):
+    """Сфера с центром в точке position - капсула нулевой высоты."""
+    def __init__(self, radius=1.0, slices=30, stacks=8,
+                 position=[0.0, 0.0, 0.0], scale=1.0, rotation=[0.0, 0.0, 0.0], material=None,
+                 anti_attractor=True):
+        super().__init__(radius, 0.0, slices, stacks, position, scale, rotation, material, anti_attractor)
+
+    def local_signed_distance(self, local_points, max_distance=None):
+        return sdf.sphere(local_points, self.radius)
+
+    def sdf_primitive(self):
+        return sdf.SPHERE, (self.radius, 0.0, 0.0)